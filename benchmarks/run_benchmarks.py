@@ -0,0 +1,393 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from functools import partial
+
+import synthetic
+
+from query_database import PaySummaryStream, Employee, Employees
+from format_handler import StringFormatter
+from file_handler import CsvReader, CsvWriter, PayslipExporter, TaxTable, BinaryTaxTable, compile_tax_tables
+from tax_calculator import get_table_name
+from pay_calculator import PayCalculator
+from pay_run import calculate_batch, fetch_employee_rows, generate_payslips
+from scenarios import ScenarioSweep, build_scenario_grid
+from year_to_date import aggregate_pay_history, financial_year_range
+from write_back import PayslipWriter
+from connect_database import ConnectionPool
+from snapshot_database import SnapshotBackend
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+LAZY_MODULES = ['pyodbc', 'tkinter.filedialog', 'tkinter.messagebox', 'query_database', 'pay_run', 'file_handler']
+
+STARTUP_SCRIPT = '''import sys, time
+start_time = time.perf_counter()
+import gui
+print(time.perf_counter() - start_time)
+print(','.join(name for name in sys.argv[1:] if name in sys.modules))'''
+
+class StageResult:
+    def __init__(self, name: str, item_count: int, latencies: list, total_time: float):
+        """
+        Summarise the timings of one benchmark stage.
+
+        Parameters:
+            name: The stage name
+            item_count: The number of employees (or rows) the stage processed
+            latencies: The time in seconds of each timed operation
+            total_time: The wall time of the whole stage in seconds
+        """
+        self.name = name
+        self.item_count = item_count
+        self.operation_count = len(latencies)
+        self.throughput = item_count / total_time if total_time else float('inf')
+        self.percentiles = self.__get_percentiles(latencies)
+
+    def __get_percentiles(self, latencies: list):
+        """
+        Get the p50, p95 and p99 operation latency in microseconds.
+
+        Parameters:
+            latencies: The time in seconds of each timed operation
+
+        Returns:
+            percentiles(dict[str, float]): The latency at each percentile
+        """
+        ordered = sorted(latencies)
+        percentiles = {}
+
+        for percentile in (50, 95, 99):
+            index = min(int(len(ordered) * percentile / 100), len(ordered) - 1)
+            percentiles['p' + str(percentile)] = ordered[index] * 1000000 if ordered else 0.0
+
+        return percentiles
+
+    def to_dict(self):
+        return {'items': self.item_count, 'operations': self.operation_count,
+                'throughput': self.throughput, **self.percentiles}
+
+def time_operations(name: str, operations, item_count: int):
+    """
+    Run and time every operation in a stage.
+
+    Parameters:
+        name: The stage name
+        operations: An iterable of functions, each run and timed once
+        item_count: The number of employees (or rows) the operations cover, used for throughput
+
+    Returns:
+        result(StageResult): The stage timings
+    """
+    latencies = []
+    clock = time.perf_counter
+    stage_start = clock()
+
+    for operation in operations:
+        start = clock()
+        operation()
+        latencies.append(clock() - start)
+
+    total_time = clock() - stage_start
+    return StageResult(name, item_count, latencies, total_time)
+
+def time_pages(name: str, pages):
+    """
+    Time each page fetch of a paged query.
+
+    Parameters:
+        name: The stage name
+        pages: A generator of pages of rows
+
+    Returns:
+        result(StageResult), rows(list): The stage timings and every fetched row
+    """
+    latencies = []
+    rows = []
+    clock = time.perf_counter
+    stage_start = clock()
+
+    while True:
+        start = clock()
+        page = next(pages, [])
+        latencies.append(clock() - start)
+
+        if not page:
+            break
+
+        rows.extend(page)
+
+    total_time = clock() - stage_start
+    return StageResult(name, len(rows), latencies, total_time), rows
+
+def time_startup(repeats: int = 5):
+    """
+    Time a cold import of the GUI module in fresh interpreters, and check that none of the modules meant to load on first use were imported.
+
+    Parameters:
+        repeats: The number of fresh interpreters to time
+
+    Returns:
+        result(StageResult), eager_modules(list[str]): The import timings and any `LAZY_MODULES` that were loaded at import
+    """
+    latencies = []
+    eager_modules = set()
+
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, *LAZY_MODULES], cwd=SOURCE_DIRECTORY,
+                                capture_output=True, text=True, check=True).stdout.splitlines()
+
+        latencies.append(float(output[0]))
+        eager_modules.update(name for name in output[1].split(',') if name)
+
+    result = StageResult('gui_import', repeats, latencies, sum(latencies))
+    return result, sorted(eager_modules)
+
+def time_tax_table_loads(tax_table_directory: str, repeats: int = 20):
+    """
+    Time a cold load and first lookup of every tax table, parsed from CSV and memory-mapped from the compiled tables.
+
+    Parameters:
+        tax_table_directory: A directory holding the tax table CSVs and their compiled `.taxbin` tables
+        repeats: The number of times each table is loaded
+
+    Returns:
+        results(list[StageResult]): The `tax_table_csv` and `tax_table_binary` stage timings
+    """
+    file_paths = [os.path.join(tax_table_directory, name) for name in sorted(os.listdir(tax_table_directory)) if name.endswith('.csv')]
+    results = []
+
+    for name, table_class, extension in (('tax_table_csv', TaxTable, '.csv'), ('tax_table_binary', BinaryTaxTable, '.taxbin')):
+        loads = [partial(lambda table_class, file_path: table_class(file_path).lookup(1000.0), table_class, \
+                         os.path.splitext(file_path)[0] + extension) for file_path in file_paths] * repeats
+        results.append(time_operations(name, loads, len(loads)))
+
+    return results
+
+def run_stages(database_path: str, export_directory: str, file_limit: int, batch_size: int = 500):
+    """
+    Run every benchmark stage against the SQLite stand-in database.
+
+    Parameters:
+        database_path: The synthetic database file
+        export_directory: A scratch directory for export stages
+        file_limit: The largest number of employees used by stages that issue one query or write one file per employee
+        batch_size: The number of employees in each batch stage operation
+
+    Returns:
+        results(list[StageResult]): The timings for each stage
+    """
+    connection = synthetic.connect_database(database_path)
+    cursor = connection.cursor()
+    results = []
+
+    pay_summary = PaySummaryStream(cursor, 'pay_summary', batch_size)
+    summary_result, summary_rows = time_pages('pay_summary_query', pay_summary.pages)
+    results.append(summary_result)
+
+    employee_ids = [row[0] for row in summary_rows]
+    limited_ids = employee_ids[:file_limit]
+
+    employee_rows = list(fetch_employee_rows(cursor, employee_ids, batch_size=batch_size))
+
+    employee_queries = (partial(Employee, cursor, 'employee_information', id) for id in limited_ids)
+    results.append(time_operations('employee_query', employee_queries, len(limited_ids)))
+
+    id_batches = [employee_ids[start:start + batch_size] for start in range(0, len(employee_ids), batch_size)]
+    batch_queries = (partial(Employees, cursor, 'employee_information', batch, batch_size) for batch in id_batches)
+    results.append(time_operations('employees_batch_query', batch_queries, len(employee_ids)))
+
+    display_strings = [str(tuple(row)) for row in summary_rows]
+    formatters = (partial(StringFormatter, text) for text in display_strings)
+    results.append(time_operations('string_formatter', formatters, len(display_strings)))
+
+    tax_lookups = [(get_table_name(row[6], row[4]), row[3] * row[7]) for row in employee_rows if row[5] is not None]
+    lookups = (partial(CsvReader, file_name, gross_pay) for file_name, gross_pay in tax_lookups)
+    results.append(time_operations('tax_table_lookup', lookups, len(tax_lookups)))
+
+    calculators = (partial(PayCalculator, row[3], row[7], row[5], row[6], row[4]) for row in employee_rows)
+    results.append(time_operations('pay_calculator', calculators, len(employee_rows)))
+
+    row_batches = [employee_rows[start:start + batch_size] for start in range(0, len(employee_rows), batch_size)]
+    batch_calculators = (partial(calculate_batch, batch) for batch in row_batches)
+    results.append(time_operations('batch_pay_calculator', batch_calculators, len(employee_rows)))
+
+    scenarios = build_scenario_grid(super_percentages=(11, 11.5, 12), rate_multipliers=(1.0, 1.02, 1.035, 1.05))
+    sweep = lambda: ScenarioSweep(employee_rows, scenarios)
+    results.append(time_operations('scenario_sweep', [sweep], len(employee_rows) * len(scenarios)))
+
+    payslips = list(generate_payslips(employee_rows[:file_limit]))
+    writers = (partial(CsvWriter, os.path.join(export_directory, str(index) + '.csv'), payslip) for index, payslip in enumerate(payslips))
+    results.append(time_operations('csv_writer', writers, len(payslips)))
+
+    combined_path = os.path.join(export_directory, 'combined.csv')
+    bulk_export = lambda: PayslipExporter(generate_payslips(employee_rows), combined_path)
+    results.append(time_operations('bulk_export', [bulk_export], len(employee_rows)))
+
+    gzip_path = os.path.join(export_directory, 'combined.csv.gz')
+    gzip_export = lambda: PayslipExporter(generate_payslips(employee_rows), gzip_path, export_format='csv.gz')
+    results.append(time_operations('bulk_export_gzip', [gzip_export], len(employee_rows)))
+
+    save_results = lambda: PayslipWriter(connection).save(generate_payslips(employee_rows))
+    results.append(time_operations('save_results', [save_results], len(employee_rows)))
+
+    source = ConnectionPool(partial(synthetic.connect_database, database_path, check_same_thread=False))
+    snapshot = SnapshotBackend(os.path.join(export_directory, 'snapshot.db'), source, page_size=batch_size)
+    results.append(time_operations('snapshot_refresh', [snapshot.refresh], len(employee_ids)))
+
+    with snapshot.cursor('pay_summary') as snapshot_cursor:
+        snapshot_summary = PaySummaryStream(snapshot_cursor, snapshot.query_name('pay_summary'), batch_size)
+        results.append(time_pages('snapshot_pay_summary', snapshot_summary.pages)[0])
+
+    snapshot.close()
+
+    history_rows = cursor.execute('SELECT COUNT(*) FROM timesheets').fetchone()[0]
+    start_date, end_date = financial_year_range(2024)
+    year_to_date = lambda: aggregate_pay_history(cursor, start_date, end_date)
+    results.append(time_operations('year_to_date', [year_to_date], history_rows))
+
+    cursor.close()
+    connection.close()
+
+    return results
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float):
+    """
+    Compare throughput against a saved baseline and list every stage that got slower by more than the tolerance.
+
+    Parameters:
+        results: The current results, keyed by employee count and then stage name
+        baseline: The saved results in the same layout
+        tolerance: The allowed throughput drop as a fraction, e.g. `0.2` for 20%
+
+    Returns:
+        regressions(list[str]): A description of each regression
+    """
+    regressions = []
+
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            saved = baseline.get(size, {}).get(stage)
+
+            if not saved or not saved['throughput']:
+                continue
+
+            change = result['throughput'] / saved['throughput'] - 1
+            print('  ' + size.rjust(8) + '  ' + stage.ljust(24) + format(change * 100, '+.1f').rjust(8) + '% throughput vs baseline')
+
+            if change < -tolerance:
+                regressions.append(stage + ' at ' + size + ' employees: ' + format(change * 100, '+.1f') + '% throughput')
+
+    return regressions
+
+def print_results(title: str, results: list):
+    """
+    Print a table of throughput and latency percentiles for one workforce size.
+
+    Parameters:
+        title: The table title, e.g. `1000 employees`
+        results: The StageResult for each stage
+    """
+    print()
+    print(title)
+    print('  ' + 'stage'.ljust(24) + 'items/s'.rjust(14) + 'p50 us'.rjust(12) + 'p95 us'.rjust(12) + 'p99 us'.rjust(12))
+
+    for result in results:
+        print('  ' + result.name.ljust(24) + format(result.throughput, ',.0f').rjust(14) +
+              format(result.percentiles['p50'], ',.1f').rjust(12) +
+              format(result.percentiles['p95'], ',.1f').rjust(12) +
+              format(result.percentiles['p99'], ',.1f').rjust(12))
+
+def parse_arguments(arguments: list):
+    """
+    Read the command-line options.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name
+
+    Returns:
+        The parsed options
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Cedarwood pay run stages against a synthetic SQLite stand-in database.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='the synthetic workforce sizes to run (default 1000 10000)')
+    parser.add_argument('--file-limit', type=int, default=2000, help='the most employees used by per-employee query and file stages (default 2000)')
+    parser.add_argument('--weeks', type=int, default=4, help='the number of weeks of timesheet history for the year-to-date stage (default 4)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results against this saved JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='the allowed throughput drop before a stage counts as a regression (default 0.2)')
+    parser.add_argument('--startup-repeats', type=int, default=5, help='the number of cold GUI imports to time (default 5, 0 to skip)')
+
+    return parser.parse_args(arguments)
+
+def main(arguments: list = None):
+    """
+    Run the benchmark suite for each workforce size, print the results, and optionally save them or compare them to a baseline.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name (defaults to `sys.argv`)
+
+    Returns:
+        The exit status - 0, or 1 if any stage regressed past the tolerance or the GUI import loaded a module that should load on first use
+    """
+    options = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    all_results = {}
+    eager_modules = []
+
+    if options.startup_repeats:
+        startup_result, eager_modules = time_startup(options.startup_repeats)
+        print_results('startup', [startup_result])
+        all_results['startup'] = {startup_result.name: startup_result.to_dict()}
+
+        if eager_modules:
+            print('  loaded at import: ' + ', '.join(eager_modules))
+
+    with tempfile.TemporaryDirectory() as scratch_directory:
+        tax_table_directory = synthetic.write_tax_tables(os.path.join(scratch_directory, 'res'))
+        synthetic.install_stand_in(tax_table_directory)
+
+        compile_tax_tables(tax_table_directory)
+        tax_table_results = time_tax_table_loads(tax_table_directory)
+        print_results('tax tables', tax_table_results)
+        all_results['tax_tables'] = {result.name: result.to_dict() for result in tax_table_results}
+
+        for size in options.sizes:
+            database_path = synthetic.create_database(os.path.join(scratch_directory, 'cedarwood.db'), size, options.weeks)
+            export_directory = tempfile.mkdtemp(dir=scratch_directory)
+
+            results = run_stages(database_path, export_directory, options.file_limit)
+            print_results(str(size) + ' employees', results)
+
+            all_results[str(size)] = {result.name: result.to_dict() for result in results}
+
+    if options.output:
+        with open(options.output, mode='w') as output_file:
+            json.dump(all_results, output_file, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        print()
+        print('Compared to ' + options.baseline)
+        regressions = compare_to_baseline(all_results, baseline, options.tolerance)
+
+        if regressions:
+            print()
+            print('Regressions:')
+
+            for regression in regressions:
+                print('  ' + regression)
+
+            return 1
+
+    if eager_modules:
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
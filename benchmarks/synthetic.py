@@ -0,0 +1,190 @@
+import os
+import sys
+import random
+import sqlite3
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import file_handler
+
+FIRST_NAMES = ['Olivia', 'Noah', 'Charlotte', 'Oliver', 'Amelia', 'Jack', 'Isla', 'William', 'Mia', 'Leo']
+LAST_NAMES = ['Smith', 'Jones', 'Williams', 'Brown', 'Wilson', 'Taylor', 'Nguyen', 'Johnson', 'Martin', 'White']
+COUNTRIES = ['Australia'] * 8 + ['New Zealand', 'United Kingdom']
+AWARD_RATES = [23.23, 24.50, 26.75, 29.10, 31.37, 35.00, 42.80]
+STANDARD_HOURS = [38, 38, 38, 40, 20, 24, 30]
+
+TAX_TABLES = {
+    'threshold_true': [(359, 0, 0), (438, 0.19, 68.3462), (548, 0.234, 87.5942), (721, 0.347, 149.5533),
+                       (865, 0.345, 148.1088), (1282, 0.345, 148.1042), (2307, 0.39, 205.7923),
+                       (3461, 0.47, 390.5462), (999999, 0.47, 390.5462)],
+    'threshold_false': [(150, 0.16, 0.16), (371, 0.2117, 7.755), (515, 0.189, -0.6702), (932, 0.3227, 68.2367),
+                        (1957, 0.32, 65.7202), (3111, 0.39, 202.7007), (999999, 0.47, 451.5698)],
+    'foreign_resident': [(2596, 0.325, 0.325), (3653, 0.37, 116.8269), (999999, 0.45, 409.0385)],
+}
+
+PAY_SUMMARY_SQL = '''SELECT e.employee_id, e.first_name, e.last_name, t.hours_worked
+FROM employees e
+JOIN timesheets t ON t.employee_id = e.employee_id
+WHERE t.date_submitted = (SELECT MAX(date_submitted) FROM timesheets)
+ORDER BY e.employee_id'''
+
+EMPLOYEE_INFORMATION_SQL = '''SELECT e.employee_id, e.first_name, e.last_name, e.hourly_rate, e.country,
+       e.tfn, e.threshold_claimed, t.hours_worked, t.date_submitted
+FROM employees e
+JOIN timesheets t ON t.employee_id = e.employee_id
+WHERE t.date_submitted = (SELECT MAX(date_submitted) FROM timesheets)
+AND e.employee_id = 0000'''
+
+TIMESHEET_VERSIONS_SQL = '''SELECT t.employee_id, t.date_submitted
+FROM timesheets t
+WHERE t.date_submitted = (SELECT MAX(date_submitted) FROM timesheets)
+ORDER BY t.employee_id'''
+
+TIMESHEET_HISTORY_SQL = '''SELECT e.employee_id, e.first_name, e.last_name, e.hourly_rate, e.country,
+       e.tfn, e.threshold_claimed, t.hours_worked, t.date_submitted
+FROM employees e
+JOIN timesheets t ON t.employee_id = e.employee_id
+WHERE t.date_submitted BETWEEN ? AND ?
+ORDER BY t.date_submitted, e.employee_id'''
+
+SAVE_PAYSLIP_SQL = '''INSERT INTO pay_results (employee_id, date_submitted, gross_cents, tax_cents, super_cents, net_cents)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (employee_id, date_submitted) DO UPDATE SET
+    gross_cents = excluded.gross_cents, tax_cents = excluded.tax_cents,
+    super_cents = excluded.super_cents, net_cents = excluded.net_cents'''
+
+# The stand-in declares threshold_claimed as BIT like the server, and reads it back as bool the way pyodbc does
+sqlite3.register_converter('BIT', lambda value: bool(int(value)))
+
+def generate_employees(employee_count: int, seed: int = 1):
+    """
+    Yield synthetic employee records with realistic award rates, residences and tax details.
+
+    Parameters:
+        employee_count: The number of employees to generate
+        seed: The random seed, so the same size always produces the same workforce
+
+    Returns:
+        A generator of `(employee_id, first_name, last_name, hourly_rate, country, tfn, threshold_claimed)` tuples
+    """
+    generator = random.Random(seed)
+
+    for employee_id in range(1, employee_count + 1):
+        hourly_rate = generator.choice(AWARD_RATES) if generator.random() < 0.8 else round(generator.uniform(22, 90), 2)
+        tfn = generator.randint(100000000, 999999999) if generator.random() < 0.95 else None
+        threshold_claimed = None if tfn is None else generator.choice([True, False])
+
+        yield (employee_id, generator.choice(FIRST_NAMES), generator.choice(LAST_NAMES), hourly_rate,
+               generator.choice(COUNTRIES), tfn, threshold_claimed)
+
+def generate_timesheets(employee_count: int, week_count: int = 1, seed: int = 2, last_week: date = date(2024, 6, 28)):
+    """
+    Yield synthetic weekly timesheets for every employee.
+
+    Parameters:
+        employee_count: The number of employees
+        week_count: The number of weeks of history to generate
+        seed: The random seed
+        last_week: The submission date of the most recent week
+
+    Returns:
+        A generator of `(employee_id, hours_worked, date_submitted)` tuples
+    """
+    generator = random.Random(seed)
+
+    for week in range(week_count):
+        date_submitted = (last_week - timedelta(weeks=week_count - week - 1)).isoformat()
+
+        for employee_id in range(1, employee_count + 1):
+            if generator.random() < 0.7:
+                hours_worked = generator.choice(STANDARD_HOURS)
+            else:
+                hours_worked = generator.randint(1, 60)
+
+            yield (employee_id, hours_worked, date_submitted)
+
+def create_database(path: str, employee_count: int, week_count: int = 1):
+    """
+    Create a SQLite stand-in for the Cedarwood database with synthetic employees and timesheets, and an empty pay results table.
+
+    Parameters:
+        path: The database file path (an existing file is replaced)
+        employee_count: The number of employees
+        week_count: The number of weeks of timesheets
+
+    Returns:
+        path(str): The database file path
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    connection = sqlite3.connect(path)
+
+    connection.executescript('''
+        CREATE TABLE employees (employee_id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT,
+                                hourly_rate REAL, country TEXT, tfn INTEGER, threshold_claimed BIT);
+        CREATE TABLE timesheets (employee_id INTEGER, hours_worked INTEGER, date_submitted TEXT,
+                                 PRIMARY KEY (employee_id, date_submitted));
+        CREATE INDEX timesheets_date ON timesheets (date_submitted);
+        CREATE TABLE pay_results (employee_id INTEGER, date_submitted TEXT, gross_cents INTEGER, tax_cents INTEGER,
+                                  super_cents INTEGER, net_cents INTEGER, PRIMARY KEY (employee_id, date_submitted));
+    ''')
+
+    connection.executemany('INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?, ?)', generate_employees(employee_count))
+    connection.executemany('INSERT INTO timesheets VALUES (?, ?, ?)', generate_timesheets(employee_count, week_count))
+    connection.commit()
+    connection.close()
+
+    return path
+
+def connect_database(path: str, check_same_thread: bool = True):
+    """
+    Open the SQLite stand-in database, converting BIT columns to bool so rows match what pyodbc returns from the server.
+
+    Parameters:
+        path: The database file path
+        check_same_thread: Whether the connection may only be used by the thread that opened it
+
+    Returns:
+        connection(Connection): An open sqlite3 connection
+    """
+    connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=check_same_thread)
+    return connection
+
+def write_tax_tables(directory: str):
+    """
+    Write the synthetic tax coefficient tables as CSV files in the same layout as `res/`.
+
+    Parameters:
+        directory: The directory to write the tables to
+
+    Returns:
+        directory(str): The tax table directory
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    for file_name, rows in TAX_TABLES.items():
+        with open(os.path.join(directory, file_name + '.csv'), mode='w') as csv_file:
+            csv_file.write('Weekly earnings less than,Coefficient A,Coefficient B\n')
+
+            for row in rows:
+                csv_file.write(','.join(str(value) for value in row) + '\n')
+
+    return directory
+
+def install_stand_in(tax_table_directory: str):
+    """
+    Point the Cedarwood modules at the SQLite stand-in - register SQLite versions of the `pay_summary`, `employee_information`, `timesheet_versions`, `timesheet_history` and `save_payslip` queries and load tax tables from `tax_table_directory`.
+
+    Parameters:
+        tax_table_directory: The directory holding the synthetic tax tables
+    """
+    file_handler.query_cache['pay_summary'] = PAY_SUMMARY_SQL
+    file_handler.query_cache['employee_information'] = EMPLOYEE_INFORMATION_SQL
+    file_handler.query_cache['timesheet_versions'] = TIMESHEET_VERSIONS_SQL
+    file_handler.query_cache['timesheet_history'] = TIMESHEET_HISTORY_SQL
+    file_handler.query_cache['save_payslip'] = SAVE_PAYSLIP_SQL
+
+    file_handler.tax_tables.directory = tax_table_directory
+    file_handler.tax_tables.clear()
@@ -1,3 +1,7 @@
+import time
+start_time = time.perf_counter()
+
 import gui
 
-gui.InitialiseWindow()
\ No newline at end of file
+if __name__ == '__main__':
+    gui.InitialiseWindow(start_time)
@@ -0,0 +1,47 @@
+import sys
+import argparse
+
+import exceptions
+from file_handler import compile_tax_tables
+
+def parse_arguments(arguments: list):
+    """
+    Read the command-line options.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name
+
+    Returns:
+        The parsed options
+    """
+    parser = argparse.ArgumentParser(description='Compile the Cedarwood tax table CSVs into memory-mapped binary tables. ' +
+                                                 'Run this before packaging, and ship the .taxbin files with the frozen app.')
+    parser.add_argument('directory', nargs='?', help='the tax table directory (defaults to the res directory next to this module)')
+
+    return parser.parse_args(arguments)
+
+def main(arguments: list = None):
+    """
+    Compile every tax table CSV in the directory and list the compiled files.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name (defaults to `sys.argv`)
+
+    Returns:
+        The exit status - 0 for success, 1 if the directory couldn't be read
+    """
+    options = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+
+    try:
+        binary_paths = compile_tax_tables(options.directory)
+    except exceptions.FileNotFoundError as error:
+        print('Could not read the tax table directory: ' + str(error), file=sys.stderr)
+        return 1
+
+    for binary_path in binary_paths:
+        print('Compiled ' + binary_path)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,43 @@
-import pyodbc
+import queue
+import threading
+from contextlib import contextmanager
+
 import exceptions
 
+def connect_sql_server(username: str, password: str):
+    """
+    Use a connection string with pyodbc to open a connection to a local host database.
+
+    The pyodbc driver is only loaded the first time a connection is opened, so the login window can appear before it has loaded.
+
+    Parameters:
+        username: User input of the server login username
+        password: User input of the server login password
+
+    Returns:
+        connection(Connection): An open pyodbc connection
+
+    Exceptions:
+        exceptions.ConnectionError: Failure to connect to the server (pyodbc OperationalError)
+    """
+    import pyodbc
+
+    server = '127.0.0.1'
+    database = 'Cedarwood'
+
+    try:
+        connection = pyodbc.connect('DRIVER={ODBC Driver 18 for SQL Server};\
+                                    SERVER='+ server +';\
+                                    DATABASE='+ database +';\
+                                    ENCRYPT=yes;\
+                                    UID='+ username + ';\
+                                    PWD='+ password +';\
+                                    TrustServerCertificate=yes')
+        return connection
+
+    except pyodbc.OperationalError as error:
+        raise exceptions.ConnectionError(error)
+
 class DatabaseConnection:
     def __init__(self, username, password):
         self.connection = self.__connect_database(username, password)
@@ -12,29 +49,231 @@ class DatabaseConnection:
         Parameters:
             username: User input of the server login username
             password: User input of the server login password
-        
+
         Returns:
             cursor(Cursor): A database cursor used for executing queries
 
         Exceptions:
             exceptions.ConnectionError: Failure to connect to the server (pyodbc OperationalError)
         """
+        connection = connect_sql_server(username, password)
+        cursor = connection.cursor()
+
+        return cursor
+
+class DatabaseBackend:
+    """
+    The interface the views use to reach the database - a cursor for each query, a connection for writes, and the query file to run for each query.
+
+    ConnectionPool serves every query from the server. SnapshotBackend serves the pay summary and employee queries from a local SQLite snapshot.
+    """
+    def cursor(self, file_name: str = None):
+        """
+        Check out a cursor that can run a query for the duration of a `with` block.
+
+        Parameters:
+            file_name: The name of the query the cursor will run, e.g. `pay_summary` (optional)
+        """
+        raise NotImplementedError
+
+    def connection(self):
+        """
+        Check out a connection for writes for the duration of a `with` block.
+        """
+        raise NotImplementedError
 
-        server = '127.0.0.1'
-        database = 'Cedarwood'
+    def query_name(self, file_name: str):
+        """
+        Get the .sql file to run on a cursor from `cursor(file_name)` - backends with a different SQL dialect use their own version of the query.
+
+        Parameters:
+            file_name: The name of the server query, e.g. `pay_summary`
+
+        Returns:
+            file_name(str): The name of the .sql file to pass to the QueryReader class
+        """
+        return file_name
+
+    def mark_stale(self):
+        """
+        Make the next read fetch current data from the server. Backends that always read from the server do nothing.
+        """
+
+    def close(self):
+        """
+        Close every connection held by the backend.
+        """
+        raise NotImplementedError
+
+class ConnectionPool(DatabaseBackend):
+    def __init__(self, connection_factory, size: int = 4, timeout: float = 30):
+        """
+        Keep up to `size` open database connections and hand them out for one unit of work at a time.
+
+        The first connection is opened straight away so bad credentials are reported at login.
+
+        Parameters:
+            connection_factory: A function that opens a new DB-API connection, e.g. `functools.partial(connect_sql_server, username, password)` or `functools.partial(sqlite3.connect, path)` for a local stand-in database
+            size: The largest number of connections open at once
+            timeout: How many seconds to wait for a free connection before giving up
+        """
+        self.connection_factory = connection_factory
+        self.size = size
+        self.timeout = timeout
+        self.closed = False
+
+        self.idle_connections = queue.LifoQueue()
+        self.available_slots = threading.BoundedSemaphore(size)
+
+        self.idle_connections.put(connection_factory())
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a healthy connection for the duration of a `with` block, returning it to the pool afterwards.
+
+        Any transaction left open by the block is committed if the block succeeds and rolled back if it raises.
+
+        Returns:
+            connection(Connection): An open database connection
+
+        Exceptions:
+            exceptions.ConnectionError: The pool is closed or no connection became free within the timeout
+        """
+        if self.closed:
+            raise exceptions.ConnectionError('The connection pool is closed')
+
+        if not self.available_slots.acquire(timeout=self.timeout):
+            raise exceptions.ConnectionError('No database connection became free within ' + str(self.timeout) + ' seconds')
+
+        connection = None
 
         try:
-            connection = pyodbc.connect('DRIVER={ODBC Driver 18 for SQL Server};\
-                                        SERVER='+ server +';\
-                                        DATABASE='+ database +';\
-                                        ENCRYPT=yes;\
-                                        UID='+ username + ';\
-                                        PWD='+ password +';\
-                                        TrustServerCertificate=yes')
-            
+            connection = self.__check_out()
+            yield connection
+            connection.commit()
+
+        except BaseException:
+            if connection is not None:
+                self.__discard_on_failure(connection)
+                connection = None
+            raise
+
+        finally:
+            if connection is not None:
+                self.__check_in(connection)
+
+            self.available_slots.release()
+
+    @contextmanager
+    def cursor(self, file_name: str = None):
+        """
+        Check out a connection and open a new cursor on it for the duration of a `with` block.
+
+        Parameters:
+            file_name: The name of the query the cursor will run - every query runs on the same server, so this is ignored
+
+        Returns:
+            cursor(Cursor): A database cursor used for executing queries
+        """
+        with self.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def close(self):
+        """
+        Close every idle connection. Connections still checked out are closed when they are returned.
+        """
+        self.closed = True
+
+        while True:
+            try:
+                connection = self.idle_connections.get_nowait()
+            except queue.Empty:
+                break
+
+            self.__close_connection(connection)
+
+    def __check_out(self):
+        """
+        Take the most recently used idle connection that passes a health check, or open a new one.
+
+        Returns:
+            connection(Connection): An open database connection
+        """
+        while True:
+            try:
+                connection = self.idle_connections.get_nowait()
+            except queue.Empty:
+                return self.connection_factory()
+
+            if self.__is_healthy(connection):
+                return connection
+
+            self.__close_connection(connection)
+
+    def __check_in(self, connection):
+        """
+        Return a connection to the idle queue, or close it if the pool has been closed.
+
+        Parameters:
+            connection: The connection to return
+        """
+        if self.closed:
+            self.__close_connection(connection)
+        else:
+            self.idle_connections.put(connection)
+
+    def __discard_on_failure(self, connection):
+        """
+        Roll back a connection after a failed unit of work, keeping it only if it still passes a health check.
+
+        Parameters:
+            connection: The connection used by the failed unit of work
+        """
+        try:
+            connection.rollback()
+        except Exception:
+            self.__close_connection(connection)
+            return
+
+        if self.__is_healthy(connection):
+            self.__check_in(connection)
+        else:
+            self.__close_connection(connection)
+
+    def __is_healthy(self, connection):
+        """
+        Run a trivial query to check a connection still works.
+
+        Parameters:
+            connection: The connection to check
+
+        Returns:
+            True if the query succeeded, otherwise False
+        """
+        try:
             cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            return True
 
-            return cursor
-        
-        except pyodbc.OperationalError as error:
-            raise exceptions.ConnectionError(error)
+        except Exception:
+            return False
+
+    def __close_connection(self, connection):
+        """
+        Close a connection, ignoring errors from connections that are already broken.
+
+        Parameters:
+            connection: The connection to close
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,121 @@
+from array import array
+from bisect import bisect_left
+
+class EmployeeIndex:
+    def __init__(self, rows: list):
+        """
+        Index pay summary rows by employee ID, first name and last name for type-ahead search.
+
+        Every ID and name word is kept once in a sorted key list, so each search term is found with a binary search for its prefix instead of a scan of every row.
+
+        Parameters:
+            rows: The pay summary rows, starting with `(employee ID, first name, last name, ...)`
+        """
+        self.rows = rows
+        self.keys, self.positions = self.__build_index(rows)
+
+        self.last_text = None
+        self.last_positions = None
+
+    def __build_index(self, rows: list):
+        """
+        Sort every lower case ID and name word together with the position of the row it came from.
+
+        Parameters:
+            rows: The pay summary rows
+
+        Returns:
+            keys(list[str]), positions(array): The sorted search keys and the row position of each key
+        """
+        entries = []
+
+        for position, row in enumerate(rows):
+            for key in get_search_keys(row):
+                entries.append((key, position))
+
+        entries.sort()
+
+        keys = [key for key, position in entries]
+        positions = array('l', [position for key, position in entries])
+
+        return keys, positions
+
+    def search(self, text: str, limit: int = None):
+        """
+        Get the rows where every word of the search text starts an employee ID, first name or last name, in pay summary order.
+
+        When the text only adds to the last search (the user typed another character), the last matches are narrowed instead of searching the whole index again.
+
+        Parameters:
+            text: The search box text, e.g. `jo sm` or `1042`
+            limit: The largest number of rows to return (optional)
+
+        Returns:
+            rows(list): The matching pay summary rows
+        """
+        text = text.lower()
+        terms = text.split()
+
+        if not terms:
+            matching_positions = range(len(self.rows))
+        elif self.last_text and text.startswith(self.last_text):
+            matching_positions = [position for position in self.last_positions \
+                                  if matches_terms(get_search_keys(self.rows[position]), terms)]
+        else:
+            matching_positions = sorted(set.intersection(*[self.__find_prefix(term) for term in terms]))
+
+        self.last_text = text if terms else None
+        self.last_positions = matching_positions
+
+        if limit is not None:
+            matching_positions = matching_positions[:limit]
+
+        rows = [self.rows[position] for position in matching_positions]
+        return rows
+
+    def __find_prefix(self, prefix: str):
+        """
+        Get the position of every row with a key that starts with the prefix.
+
+        Parameters:
+            prefix: A lower case search term
+
+        Returns:
+            positions(set[int]): The matching row positions
+        """
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+
+        positions = set(self.positions[start:end])
+        return positions
+
+def get_search_keys(row):
+    """
+    Get the lower case employee ID and name words that a pay summary row can be found by.
+
+    Parameters:
+        row: A pay summary row, starting with `(employee ID, first name, last name, ...)`
+
+    Returns:
+        keys(set[str]): The search keys, e.g. `{'1042', 'mary', 'ann', 'smith'}`
+    """
+    employee_id, first_name, last_name = row[0], row[1], row[2]
+
+    keys = {str(employee_id)}
+    keys.update(str(first_name or '').lower().split())
+    keys.update(str(last_name or '').lower().split())
+
+    return keys
+
+def matches_terms(keys: set, terms: list):
+    """
+    Check that every search term starts at least one of a row's search keys.
+
+    Parameters:
+        keys: The row's search keys from `get_search_keys`
+        terms: The lower case search terms
+
+    Returns:
+        True if the row matches every term
+    """
+    return all(any(key.startswith(term) for key in keys) for term in terms)
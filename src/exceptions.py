@@ -16,4 +16,24 @@ class FileNotFoundError(BaseException):
         self.inner_exception = exception
     
     def __str__(self):
-        return str(self.inner_exception)
\ No newline at end of file
+        return str(self.inner_exception)
+
+class ExportFormatError(BaseException):
+    """
+    Returns an exception string when an export format is unknown or its optional library isn't installed.
+    """
+    def __init__(self, exception):
+        self.inner_exception = exception
+
+    def __str__(self):
+        return str(self.inner_exception)
+
+class TaxTableFormatError(BaseException):
+    """
+    Returns an exception string when a compiled tax table file is damaged or was written by a different format version.
+    """
+    def __init__(self, exception):
+        self.inner_exception = exception
+
+    def __str__(self):
+        return str(self.inner_exception)
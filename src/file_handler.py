@@ -1,17 +1,30 @@
 import os
 import sys
 import csv
+import gzip
+import mmap
+import struct
+import threading
 import exceptions
+from instrumentation import timings
+from array import array
+from bisect import bisect_right
+from decimal import Decimal
 from codecs import open
 
+query_cache = {}
+
 class QueryReader:
     def __init__(self, file_name: str):
-        self.query = self.__read_file(file_name)
+        with timings.time('query_reader'):
+            self.query = self.__read_file(file_name)
 
     def __read_file(self, file_name: str):
         """
         Get the current working directory and read the SQL file at the specified location.
 
+        Each file is only read once - the query string is kept in `query_cache` and reused for every later read of the same file name.
+
         Parameters:
             file_name: The SQL file to read
         
@@ -21,6 +34,11 @@ class QueryReader:
         Exceptions:
             exceptions.FileNotFoundError: The file couldn't be read because it wasn't in the specified location
         """
+        query = query_cache.get(file_name)
+
+        if query is not None:
+            return query
+
         sql_file = 'res/' + file_name + '.sql'
 
         if getattr(sys, 'frozen', False):
@@ -31,54 +49,397 @@ class QueryReader:
         file_path = os.path.join(working_directory, sql_file)
 
         try:
-            query = open(file_path, mode='r', encoding='utf-8-sig').read()
+            with open(file_path, mode='r', encoding='utf-8-sig') as sql_file:
+                query = sql_file.read()
+
+            query_cache[file_name] = query
             return query
 
         except FileNotFoundError as error:
             raise exceptions.FileNotFoundError(error)
 
-class CsvReader:
-    def __init__(self, file_name: str, comparison_variable: int):
-        self.row_result = self.__read_file(file_name, comparison_variable)
+def get_working_directory():
+    """
+    Get the directory that resource files are resolved from.
 
-    def __read_file(self, file_name: str, comparison_variable: int):
+    Returns:
+        working_directory(str): The directory of the frozen executable, or the directory of this module when running from source
+    """
+    if getattr(sys, 'frozen', False):
+        working_directory = os.path.dirname(sys.executable)
+    else:
+        working_directory = os.path.dirname(os.path.abspath(__file__))
+
+    return working_directory
+
+class TaxTable:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.modified_time = os.path.getmtime(file_path)
+        self.upper_limits, self.coefficients_a, self.coefficients_b = self.__parse_file(file_path)
+
+    def __parse_file(self, file_path: str):
         """
-        Get the current working directory and read the CSV file at the specified location.
+        Read every row of a tax table CSV once and store the columns as arrays sorted by the upper earnings limit.
 
-        Iterate through each row in the CSV until `comparison variable < upper earnings limit` then assign coefficients A and B to the corresponding row indexes.
+        Parameters:
+            file_path: The full path of the tax table CSV
+        
+        Returns:
+            upper_limits, coefficients_a and coefficients_b as arrays of floats
+        """
+        rows = []
+
+        with open(file_path) as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=',')
+            next(csv_reader, None)
+
+            for row in csv_reader:
+                if row:
+                    rows.append((float(row[0]), float(row[1]), float(row[2])))
+
+        rows.sort(key=lambda row: row[0])
+
+        upper_limits = array('d', [row[0] for row in rows])
+        coefficients_a = array('d', [row[1] for row in rows])
+        coefficients_b = array('d', [row[2] for row in rows])
+
+        return upper_limits, coefficients_a, coefficients_b
+
+    def close(self):
+        """
+        Release the table's resources. A parsed CSV table holds no open files, so there is nothing to release.
+        """
+
+    def lookup(self, comparison_variable: float):
+        """
+        Find the first tax table row where `comparison variable < upper earnings limit` with a binary search.
 
         Parameters:
-            file_name: The CSV file to read
             comparison_variable: The gross pay result passed from the PayCalculator class
-        
+
         Returns:
-            `coef_a` and `coef_b` as floats
+            `coef_a` and `coef_b` as floats, or None if the value is above every upper earnings limit
+        """
+        index = bisect_right(self.upper_limits, comparison_variable)
+
+        if index < len(self.upper_limits):
+            return self.coefficients_a[index], self.coefficients_b[index]
+
+    def lookup_many(self, comparison_variables: list):
+        """
+        Find the tax table coefficients for a whole column of values in one pass.
+
+        Parameters:
+            comparison_variables: The gross pay results to look up
+
+        Returns:
+            coefficients_a and coefficients_b as lists of floats, with None where a value is above every upper earnings limit
+        """
+        upper_limits = self.upper_limits
+        table_a = self.coefficients_a
+        table_b = self.coefficients_b
+        row_count = len(upper_limits)
+
+        indexes = [bisect_right(upper_limits, value) for value in comparison_variables]
+
+        coefficients_a = [table_a[index] if index < row_count else None for index in indexes]
+        coefficients_b = [table_b[index] if index < row_count else None for index in indexes]
+
+        return coefficients_a, coefficients_b
+
+TAX_TABLE_EXTENSION = '.taxbin'
+TAX_TABLE_MAGIC = b'CWTAXTB\x00'
+TAX_TABLE_FORMAT_VERSION = 1
+
+# Magic bytes, format version, column count, row count - followed by the upper limits, coefficient A and coefficient B columns as little-endian float64 values
+TAX_TABLE_HEADER = struct.Struct('<8sHHI')
+
+class BinaryTaxTable(TaxTable):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.modified_time = os.path.getmtime(file_path)
+        self.upper_limits, self.coefficients_a, self.coefficients_b = self.__map_file(file_path)
+
+    def __map_file(self, file_path: str):
+        """
+        Memory-map a compiled tax table and view its three columns in place, so loading doesn't parse any text and only the pages a lookup touches are read.
+
+        Parameters:
+            file_path: The full path of the compiled tax table
+
+        Returns:
+            upper_limits, coefficients_a and coefficients_b as read-only sequences of floats
+
+        Exceptions:
+            exceptions.TaxTableFormatError: The file isn't a compiled tax table, was compiled by a different format version, or is the wrong size
+        """
+        with open(file_path, mode='rb') as binary_file:
+            try:
+                mapped_file = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise exceptions.TaxTableFormatError(file_path + ' is empty')
+
+        if len(mapped_file) < TAX_TABLE_HEADER.size:
+            raise exceptions.TaxTableFormatError(file_path + ' is too short to be a compiled tax table')
+
+        magic, format_version, column_count, row_count = TAX_TABLE_HEADER.unpack_from(mapped_file)
+
+        if magic != TAX_TABLE_MAGIC:
+            raise exceptions.TaxTableFormatError(file_path + ' is not a compiled tax table')
+
+        if format_version != TAX_TABLE_FORMAT_VERSION or column_count != 3:
+            raise exceptions.TaxTableFormatError(file_path + ' was compiled with format version ' + str(format_version) + \
+                                                 ', expected version ' + str(TAX_TABLE_FORMAT_VERSION) + ' - compile the tax tables again')
+
+        if len(mapped_file) != TAX_TABLE_HEADER.size + column_count * row_count * 8:
+            raise exceptions.TaxTableFormatError(file_path + ' is the wrong size for ' + str(row_count) + ' rows')
+
+        self.mapped_file = mapped_file
+        self.views = []
+
+        if sys.byteorder == 'little':
+            file_view = memoryview(mapped_file)
+            values = file_view[TAX_TABLE_HEADER.size:].cast('d')
+            self.views.extend([file_view, values])
+        else:
+            values = array('d')
+            values.frombytes(mapped_file[TAX_TABLE_HEADER.size:])
+            values.byteswap()
+
+        columns = values[:row_count], values[row_count:2 * row_count], values[2 * row_count:]
+
+        if sys.byteorder == 'little':
+            self.views.extend(columns)
+
+        return columns
+
+    def close(self):
+        """
+        Release the views of the mapped file and close the mapping, so the file can be replaced - Windows won't replace a file that is still mapped.
+        """
+        for view in reversed(self.views):
+            view.release()
+
+        self.views = []
+        self.mapped_file.close()
+
+def compile_tax_table(csv_path: str, binary_path: str = None):
+    """
+    Compile a tax table CSV into a fixed-width binary file that the BinaryTaxTable class can memory-map.
+
+    The rows are sorted by upper earnings limit and written as a header followed by one column of float64 values after another. The file is written next to the CSV and then moved into place, so a reader never sees half a table.
+
+    Parameters:
+        csv_path: The full path of the tax table CSV
+        binary_path: The compiled file to write (defaults to the CSV path with the `.taxbin` extension)
+
+    Returns:
+        binary_path(str): The full path of the compiled tax table
+    """
+    if binary_path is None:
+        binary_path = os.path.splitext(csv_path)[0] + TAX_TABLE_EXTENSION
+
+    tax_table = TaxTable(csv_path)
+    row_count = len(tax_table.upper_limits)
+    temporary_path = binary_path + '.tmp'
+
+    with open(temporary_path, mode='wb') as binary_file:
+        binary_file.write(TAX_TABLE_HEADER.pack(TAX_TABLE_MAGIC, TAX_TABLE_FORMAT_VERSION, 3, row_count))
+
+        for column in (tax_table.upper_limits, tax_table.coefficients_a, tax_table.coefficients_b):
+            column = array('d', column)
+
+            if sys.byteorder != 'little':
+                column.byteswap()
+
+            binary_file.write(column.tobytes())
+
+    os.replace(temporary_path, binary_path)
+    return binary_path
+
+def compile_tax_tables(directory: str = None):
+    """
+    Compile every tax table CSV in a directory.
+
+    Parameters:
+        directory: The tax table directory (defaults to the `res` resource directory)
+
+    Returns:
+        binary_paths(list[str]): The full path of each compiled tax table
+
+    Exceptions:
+        exceptions.FileNotFoundError: The directory couldn't be read because it wasn't in the specified location
+    """
+    if directory is None:
+        directory = os.path.join(get_working_directory(), 'res')
+
+    try:
+        file_names = sorted(name for name in os.listdir(directory) if name.endswith('.csv'))
+    except FileNotFoundError as error:
+        raise exceptions.FileNotFoundError(error)
+
+    binary_paths = [compile_tax_table(os.path.join(directory, file_name)) for file_name in file_names]
+    return binary_paths
+
+class TaxTableRegistry:
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.tables = {}
+        self.version = 0
+        self.lock = threading.RLock()
+
+    def get_table(self, file_name: str):
+        """
+        Get a parsed tax table, only reading the file again if it has changed on disk since it was last loaded.
+
+        A replaced table isn't closed - other threads may still be looking up values in it, so its memory map is released once the last of them drops it.
+
+        A compiled `.taxbin` table is memory-mapped instead of parsing the CSV whenever it is at least as new as the CSV, or always in the frozen build.
+
+        Parameters:
+            file_name: The tax table to load (without the file extension)
+
+        Returns:
+            tax_table(TaxTable): The parsed tax table
+
+        Exceptions:
+            exceptions.FileNotFoundError: The file couldn't be read because it wasn't in the specified location
+            exceptions.TaxTableFormatError: The compiled table is damaged or was compiled by a different format version
+        """
+        file_path = self.__get_file_path(file_name)
+        tax_table = self.tables.get(file_name)
+
+        try:
+            modified_time = os.path.getmtime(file_path)
+
+            if tax_table is None or tax_table.file_path != file_path or tax_table.modified_time != modified_time:
+                with self.lock:
+                    tax_table = self.tables.get(file_name)
+
+                    if tax_table is None or tax_table.file_path != file_path or tax_table.modified_time != modified_time:
+                        if file_path.endswith(TAX_TABLE_EXTENSION):
+                            new_table = BinaryTaxTable(file_path)
+                        else:
+                            new_table = TaxTable(file_path)
+
+                        if tax_table is not None:
+                            self.version += 1
+
+                        tax_table = new_table
+                        self.tables[file_name] = tax_table
+
+        except FileNotFoundError as error:
+            raise exceptions.FileNotFoundError(error)
+
+        return tax_table
+
+    def check_for_changes(self):
+        """
+        Reload any loaded tax table whose file has changed on disk, so `version` changes even if the table hasn't been looked up since.
+
+        Returns:
+            version(int): The registry version, which goes up every time a loaded table is replaced
+        """
+        with self.lock:
+            for file_name in list(self.tables):
+                try:
+                    self.get_table(file_name)
+                except exceptions.FileNotFoundError:
+                    del self.tables[file_name]
+                    self.version += 1
+
+            return self.version
+
+    def fingerprint(self):
+        """
+        Describe every tax table file in the registry directory by name and modification time, so saved results can tell if the tables have changed since they were calculated.
+
+        Returns:
+            fingerprint(str): The file names and modification times, e.g. `foreign_resident.csv:1719532800.0;foreign_resident.taxbin:...`
+        """
+        directory = os.path.dirname(self.__get_file_path(''))
+
+        try:
+            file_names = sorted(name for name in os.listdir(directory) if name.endswith(('.csv', TAX_TABLE_EXTENSION)))
+        except FileNotFoundError:
+            return ''
+
+        fingerprint = ';'.join(name + ':' + repr(os.path.getmtime(os.path.join(directory, name))) for name in file_names)
+        return fingerprint
+
+    def clear(self):
+        """
+        Remove and close every loaded tax table so the next lookup reads the files again.
+
+        Only call this when no other thread is looking up tax rates, e.g. at shutdown or before a run starts - a closed table can't be read.
+        """
+        with self.lock:
+            for tax_table in self.tables.values():
+                tax_table.close()
+
+            self.tables.clear()
+            self.version += 1
+
+    def __get_file_path(self, file_name: str):
+        """
+        Join the tax table file name to the registry directory, or to the resource directory if no directory was given.
+
+        The compiled table is chosen if there is no CSV, if it is at least as new as the CSV, or if the app is frozen - otherwise the CSV is used, so editing a CSV during development takes effect without compiling again.
+
+        Parameters:
+            file_name: The tax table name (without the file extension)
+
+        Returns:
+            file_path(str): The full path of the compiled tax table or the tax table CSV
         """
-        csv_file = 'res/' + file_name + '.csv'
+        if self.directory is None:
+            self.directory = os.path.join(get_working_directory(), 'res')
+
+        csv_path = os.path.join(self.directory, file_name + '.csv')
+        binary_path = os.path.join(self.directory, file_name + TAX_TABLE_EXTENSION)
+
+        try:
+            binary_time = os.path.getmtime(binary_path)
+        except OSError:
+            return csv_path
 
         if getattr(sys, 'frozen', False):
-            working_directory = os.path.dirname(sys.executable)
-        elif __file__:
-            working_directory = os.path.dirname(__file__)
+            return binary_path
 
-        file_path = os.path.join(working_directory, csv_file)
+        try:
+            csv_time = os.path.getmtime(csv_path)
+        except OSError:
+            return binary_path
 
-        with open(file_path) as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=',')
-            line_count = 0
+        file_path = binary_path if binary_time >= csv_time else csv_path
+        return file_path
 
-            for row in csv_reader:
-                if line_count == 0:
-                    line_count += 1
-                else:
-                    upper_limit = float(row[0])
-                    coef_a = float(row[1])
-                    coef_b = float(row[2])
+tax_tables = TaxTableRegistry()
 
-                    line_count += 1
+class CsvReader:
+    def __init__(self, file_name: str, comparison_variable: int):
+        with timings.time('csv_reader'):
+            self.row_result = self.__read_file(file_name, comparison_variable)
 
-                    if comparison_variable < upper_limit:
-                        return coef_a, coef_b
+    def __read_file(self, file_name: str, comparison_variable: int):
+        """
+        Get the tax table from the shared TaxTableRegistry and find the row where `comparison variable < upper earnings limit`.
+
+        The table is only loaded the first time it is used (or after it changes on disk), so repeated lookups don't read the file again.
+
+        Parameters:
+            file_name: The CSV file to read
+            comparison_variable: The gross pay result passed from the PayCalculator class
+        
+        Returns:
+            `coef_a` and `coef_b` as floats
+        """
+        tax_table = tax_tables.get_table(file_name)
+        return tax_table.lookup(comparison_variable)
+
+PAYSLIP_HEADER = ['Employee ID', 'First Name', 'Last Name', 'Date Submitted', \
+                  'Gross Pay', 'Tax Amount', 'Superannuation', 'Net Pay']
 
 class CsvWriter:
     def __init__(self, file_path: str, payslip_data: list):
@@ -92,11 +453,272 @@ class CsvWriter:
             file_path: The export location and templated file name
             payslip_data: The employee payslip data values
         """
-        header = ['Employee ID', 'First Name', 'Last Name', 'Date Submitted', \
-                  'Gross Pay', 'Tax Amount', 'Superannuation', 'Net Pay']
+        header = PAYSLIP_HEADER
 
         with open(file_path, mode='w') as csv_file:
             csv_writer = csv.writer(csv_file)
             csv_writer.writerow(header)
             csv_writer.writerow(payslip_data)
-        
\ No newline at end of file
+
+class CsvExport:
+    extension = '.csv'
+
+    def __init__(self, file_path: str, buffer_size: int = 65536):
+        """
+        Write payslips to a plain CSV file through a write buffer, starting with the payslip header.
+
+        Parameters:
+            file_path: The CSV file to write
+            buffer_size: The write buffer size in bytes
+        """
+        self.file = open(file_path, mode='w', buffering=buffer_size)
+        self.csv_writer = csv.writer(self.file)
+        self.csv_writer.writerow(PAYSLIP_HEADER)
+
+    def write(self, payslip_data: list):
+        """
+        Write one payslip as a CSV row.
+
+        Parameters:
+            payslip_data: The payslip fields in `PAYSLIP_HEADER` order
+        """
+        self.csv_writer.writerow(payslip_data)
+
+    def close(self):
+        """
+        Flush the write buffer and close the file.
+        """
+        self.file.close()
+
+    def __enter__(self):
+        """
+        Use the export as a context manager, so the file is closed even if writing a payslip fails.
+
+        Returns:
+            The export itself
+        """
+        return self
+
+    def __exit__(self, *exception_details):
+        """
+        Close the file when the `with` block ends.
+
+        Parameters:
+            exception_details: The exception type, value and traceback, if the block raised one - the exception isn't suppressed
+        """
+        self.close()
+
+class GzipCsvExport(CsvExport):
+    extension = '.csv.gz'
+
+    def __init__(self, file_path: str, buffer_size: int = 65536, compression_level: int = 6):
+        """
+        Write payslips to a gzip-compressed CSV file as they are produced, so no uncompressed copy is written first.
+
+        Parameters:
+            file_path: The compressed CSV file to write
+            buffer_size: The write buffer size in bytes
+            compression_level: The gzip compression level from 1 (fastest) to 9 (smallest)
+        """
+        self.file = gzip.open(file_path, mode='wt', compresslevel=compression_level, encoding='utf-8', newline='')
+        self.csv_writer = csv.writer(self.file)
+        self.csv_writer.writerow(PAYSLIP_HEADER)
+
+class ParquetExport:
+    extension = '.parquet'
+
+    def __init__(self, file_path: str, buffer_size: int = 65536, row_group_size: int = 65536):
+        """
+        Write payslips to a columnar Parquet file with typed columns - the employee ID as a 64-bit integer and every amount as a 2 decimal place number.
+
+        Payslips are collected into row groups of `row_group_size` rows, so only one row group is held in memory at a time. Needs the optional `pyarrow` library.
+
+        Parameters:
+            file_path: The Parquet file to write
+            buffer_size: Not used - Parquet files are written a row group at a time
+            row_group_size: The number of payslips in each row group
+
+        Exceptions:
+            exceptions.ExportFormatError: The `pyarrow` library isn't installed
+        """
+        self.pyarrow, parquet = import_pyarrow()
+        self.row_group_size = row_group_size
+        self.rows = []
+
+        self.schema = self.pyarrow.schema([('employee_id', self.pyarrow.int64()),
+                                           ('first_name', self.pyarrow.string()),
+                                           ('last_name', self.pyarrow.string()),
+                                           ('date_submitted', self.pyarrow.string()),
+                                           ('gross_pay', self.pyarrow.decimal128(12, 2)),
+                                           ('tax_amount', self.pyarrow.decimal128(12, 2)),
+                                           ('superannuation', self.pyarrow.decimal128(12, 2)),
+                                           ('net_pay', self.pyarrow.decimal128(12, 2))])
+
+        self.parquet_writer = parquet.ParquetWriter(file_path, self.schema, compression='snappy')
+
+    def write(self, payslip_data: list):
+        """
+        Add one payslip to the current row group, writing the row group once it holds `row_group_size` payslips.
+
+        Parameters:
+            payslip_data: The payslip fields in `PAYSLIP_HEADER` order
+        """
+        self.rows.append(payslip_data)
+
+        if len(self.rows) == self.row_group_size:
+            self.__write_row_group()
+
+    def close(self):
+        """
+        Write the last partly filled row group and close the file, which writes the Parquet footer.
+        """
+        if self.rows:
+            self.__write_row_group()
+
+        self.parquet_writer.close()
+
+    def __enter__(self):
+        """
+        Use the export as a context manager, so the file is closed even if writing a payslip fails.
+
+        Returns:
+            The export itself
+        """
+        return self
+
+    def __exit__(self, *exception_details):
+        """
+        Close the file when the `with` block ends.
+
+        Parameters:
+            exception_details: The exception type, value and traceback, if the block raised one - the exception isn't suppressed
+        """
+        self.close()
+
+    def __write_row_group(self):
+        """
+        Convert the collected payslips to typed columns and write them as one row group.
+        """
+        employee_ids, first_names, last_names, dates_submitted, *amounts = zip(*self.rows)
+
+        columns = [[int(employee_id) for employee_id in employee_ids], list(first_names), list(last_names),
+                   [str(date_submitted) for date_submitted in dates_submitted]]
+        columns += [[Decimal(str(amount)) for amount in column] for column in amounts]
+
+        table = self.pyarrow.Table.from_arrays([self.pyarrow.array(column, type=field.type) \
+                                                for column, field in zip(columns, self.schema)], schema=self.schema)
+
+        self.parquet_writer.write_table(table)
+        self.rows = []
+
+def import_pyarrow():
+    """
+    Import the optional `pyarrow` library the first time a Parquet export is written, so every other export works without it.
+
+    Returns:
+        pyarrow(module), parquet(module): The `pyarrow` and `pyarrow.parquet` modules
+
+    Exceptions:
+        exceptions.ExportFormatError: The `pyarrow` library isn't installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet as parquet
+
+    except ImportError as error:
+        raise exceptions.ExportFormatError('Parquet export needs the pyarrow library: ' + str(error))
+
+    return pyarrow, parquet
+
+EXPORT_FORMATS = {'csv': CsvExport, 'csv.gz': GzipCsvExport, 'parquet': ParquetExport}
+
+def get_export_format(format_name: str):
+    """
+    Get the export class for a format name, checking that any optional library it needs is installed.
+
+    Parameters:
+        format_name: One of the `EXPORT_FORMATS` names - `csv`, `csv.gz` or `parquet`
+
+    Returns:
+        export_format(type): The export class, e.g. CsvExport
+
+    Exceptions:
+        exceptions.ExportFormatError: The format name is unknown or its library isn't installed
+    """
+    export_format = EXPORT_FORMATS.get(format_name)
+
+    if export_format is None:
+        raise exceptions.ExportFormatError('Unknown export format: ' + str(format_name) + \
+                                           ' (choose from ' + ', '.join(EXPORT_FORMATS) + ')')
+
+    if export_format is ParquetExport:
+        import_pyarrow()
+
+    return export_format
+
+class PayslipExporter:
+    def __init__(self, payslips, export_location: str, combined: bool = True, progress_callback = None, \
+                 progress_interval: int = 100, buffer_size: int = 65536, export_format: str = 'csv'):
+        self.exported_count = self.__write_files(payslips, export_location, combined, progress_callback, \
+                                                 progress_interval, buffer_size, get_export_format(export_format))
+
+    def __write_files(self, payslips, export_location: str, combined: bool, progress_callback, \
+                      progress_interval: int, buffer_size: int, export_class: type):
+        """
+        Stream payslip data values into either one combined export file or one export file per employee.
+
+        Payslips are written as they are produced, so only one payslip (or one Parquet row group) is held in memory at a time.
+
+        Parameters:
+            payslips: An iterable of payslip data values in the same order as the CSV header
+            export_location: The combined export file path, or the export directory when writing one file per employee
+            combined: Whether to write every payslip to one file
+            progress_callback: An optional function called with the number of payslips written so far
+            progress_interval: How many payslips to write between progress callbacks
+            buffer_size: The write buffer size in bytes
+            export_class: The export class for the chosen format, e.g. CsvExport or ParquetExport
+
+        Returns:
+            exported_count(int): The number of payslips written
+        """
+        exported_count = 0
+
+        if combined:
+            with export_class(export_location, buffer_size) as export_file:
+                for payslip_data in payslips:
+                    export_file.write(payslip_data)
+                    exported_count += 1
+
+                    if progress_callback and exported_count % progress_interval == 0:
+                        progress_callback(exported_count)
+        else:
+            for payslip_data in payslips:
+                file_path = os.path.join(export_location, get_payslip_file_name(payslip_data) + export_class.extension)
+
+                with export_class(file_path, buffer_size) as export_file:
+                    export_file.write(payslip_data)
+
+                exported_count += 1
+
+                if progress_callback and exported_count % progress_interval == 0:
+                    progress_callback(exported_count)
+
+        if progress_callback and exported_count % progress_interval != 0:
+            progress_callback(exported_count)
+
+        return exported_count
+
+def get_payslip_file_name(payslip_data: list):
+    """
+    Get the templated file name for a single payslip export.
+
+    Parameters:
+        payslip_data: The employee payslip data values
+
+    Returns:
+        file_name(str): The file name in the format `payslip_FirstNameLastName_DateSubmitted` (without the file extension)
+    """
+    employee_id, first_name, last_name, date_submitted = payslip_data[:4]
+
+    file_name = 'payslip_' + first_name + last_name + '_' + str(date_submitted)
+    return file_name
@@ -1,3 +1,5 @@
+import re
+
 class StringFormatter:
     def __init__(self, query: str):
         self.individual_entries = self.__format_query(query)
@@ -34,6 +36,31 @@ class PlaceholderHandler:
         updated_string = query.replace('0000', id)
         return updated_string
 
+class PlaceholderListHandler:
+    def __init__(self, query: str, parameter_count: int):
+        self.updated_string = self.__replace_value(query, parameter_count)
+
+    def __replace_value(self, query: str, parameter_count: int):
+        """
+        Find the `= 0000` placeholder comparison in the query string and replace it with an `IN` list of parameter markers.
+
+        Parameters:
+            query: The query string to find the placeholder comparison from
+            parameter_count: The number of `?` parameter markers to put in the `IN` list
+
+        Returns:
+            updated_string(str): The new query string that matches any of the passed employee IDs
+
+        Exceptions:
+            ValueError: The query string doesn't compare a column to the placeholder value
+        """
+        updated_string, replacements = re.subn(r'=\s*0000\b', 'IN (' + ', '.join(['?'] * parameter_count) + ')', query)
+
+        if replacements == 0:
+            raise ValueError('The query has no `= 0000` placeholder to replace')
+
+        return updated_string
+
 class CentRounder:
     def __init__(self, calculator_results: tuple[str, str, str, str]):
         self.rounded_results = self.__round_decimal_place(calculator_results)
@@ -54,3 +81,32 @@ class CentRounder:
         net_pay = format(calculator_results[3], '.2f')
 
         return gross_pay, tax_amount, superannuation, net_pay
+
+
+def to_cents(amount: float):
+    """
+    Convert a calculation result to whole cents, rounding in exactly the same way as the CentRounder class.
+
+    Parameters:
+        amount: The calculation result in AUD
+
+    Returns:
+        cents(int): The amount in cents
+    """
+    cents = int(format(amount, '.2f').replace('.', ''))
+    return cents
+
+def format_cents(cents: int):
+    """
+    Format a whole-cent amount as a string with 2 decimal places (for GUI and export purposes).
+
+    Parameters:
+        cents: The amount in cents
+
+    Returns:
+        The amount in AUD as a string, e.g. `1234.50`
+    """
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(cents), 100)
+
+    return sign + str(dollars) + '.' + str(remainder).zfill(2)
@@ -1,56 +1,164 @@
+import os
+import time
 import tkinter as tk
-from tkinter import filedialog
-from tkinter import messagebox
+from datetime import date
+from functools import partial
 
-from pyodbc import Cursor
-
-from connect_database import DatabaseConnection
-from query_database import PaySummary, Employee
-from format_handler import StringFormatter
-from pay_calculator import PayCalculator
-from file_handler import CsvWriter
+import exceptions
+from connect_database import DatabaseBackend, ConnectionPool, connect_sql_server
+from worker import BackgroundWorker
+from instrumentation import timings
 
 class InitialiseWindow:
-    def __init__(self):
+    def __init__(self, start_time: float = None):
         """
         Call the main loop of Tkinter to show the app window.
+
+        The time from `start_time` until the main loop is first idle (the login window is on screen) is recorded as the `startup` stage.
+
+        Parameters:
+            start_time: The `time.perf_counter()` value when the app process started (defaults to when this class is called)
         """
+        if start_time is None:
+            start_time = time.perf_counter()
+
         window = tk.Tk()
         main = MainView(window)
         main.pack(side='top', fill='both', expand=True)
         window.wm_geometry('400x350')
         window.title('Cedarwood')
+        window.after_idle(lambda: timings.record('startup', time.perf_counter() - start_time))
         window.mainloop()
+        main.worker.shutdown()
+        timings.dump_if_requested()
 
 class Page(tk.Frame):
-    def __init__(self, *args, **kwargs):
-        tk.Frame.__init__(self, *args, **kwargs)
+    def __init__(self, views: 'ViewManager'):
+        tk.Frame.__init__(self, views.container)
+        self.views = views
+        self.worker = views.worker
+        self.tasks = []
+
+        self.place(x=0, y=0, relwidth=1, relheight=1)
+
     def show(self):
         """
         Raise the current page in the viewing stack.
         """
         self.lift()
 
+    def run_in_background(self, function, on_success, on_poll = None):
+        """
+        Run a query or calculation on the background worker, showing an error message if it fails.
+
+        Parameters:
+            function: The function to run off the Tkinter main thread
+            on_success: Called on the main thread with the function's return value
+            on_poll: Called on the main thread while the function is still running
+        """
+        task = self.worker.submit(function, on_success, self.show_error, on_poll)
+
+        self.tasks = [running_task for running_task in self.tasks if not running_task.future.done()]
+        self.tasks.append(task)
+
+    def cancel_tasks(self):
+        """
+        Cancel every background task started by this page, so no results arrive after the user has left the page.
+        """
+        for task in self.tasks:
+            task.cancel()
+
+        self.tasks = []
+
+    def show_error(self, error: BaseException):
+        """
+        Show an error message for a failed background task.
+
+        Parameters:
+            error: The exception raised by the task
+        """
+        from tkinter import messagebox
+
+        messagebox.showerror('Error', str(error))
+
 class PayslipView(Page):
-    def __init__(self, cursor: Cursor, id: int):
+    def __init__(self, views: 'ViewManager', database: DatabaseBackend, id: int, employee_record = None, payslip: tuple = None):
         """
-        Get an employee record from the employee query, passing the results to the PayCalculator class, and displaying all results.
+        Show a loading message while the employee query and PayCalculator class run in the background, then display all results.
+
+        If the Summary view already prefetched the payslip, it is shown straight away. If only the employee record was prefetched, the payslip is calculated and shown without a query.
 
-        Load the GUI elements - subtitle label, date label, basic info label, hours label, tax label, pay info label, export button, back button.
+        Load the GUI elements - loading label and back button, then subtitle label, date label, basic info label, hours label, tax label, pay info label, export button, back button.
 
         Parameters:
-            cursor: The database cursor used for executing queries in the Employee class
+            views: The ViewManager that shows this view and runs its background tasks
+            database: The database backend used to get a cursor for the Employee class
             id: The employee ID to use in the query string
+            employee_record: The employee's `employee_information` row, if it has already been fetched
+            payslip: The employee record and rounded calculation results, if they have already been calculated
         """
-        Page.__init__(self)
+        Page.__init__(self, views)
 
         self.gui_objects = []
-        self.database_cursor = cursor
+        self.database = database
+
+        self.loading_label = tk.Label(self, text='Loading payslip...')
+        self.back_button = tk.Button(self, text='Go back', command=self.__go_back)
+
+        self.gui_objects.extend([self.loading_label, self.back_button])
+
+        for object in self.gui_objects:
+            object.pack()
+
+        if payslip is not None:
+            self.__show_payslip(payslip)
+        elif employee_record is not None:
+            self.__show_payslip(self.__calculate_payslip(employee_record))
+        else:
+            self.run_in_background(partial(self.__load_payslip, id), self.__show_payslip)
+
+    def __load_payslip(self, id: int):
+        """
+        Get an employee record from the employee query and pass the results to the PayCalculator class. Runs on a worker thread.
+
+        Parameters:
+            id: The employee ID to use in the query string
+
+        Returns:
+            query_result(Row), results(tuple[str, str, str, str]): The employee record and the rounded calculation results
+        """
+        from query_database import Employee
 
         file_name = 'employee_information'
 
-        employee_data = Employee(cursor, file_name, id)
-        query_result = employee_data.query_result
+        with self.database.cursor(file_name) as cursor:
+            employee_data = Employee(cursor, self.database.query_name(file_name), id)
+
+        return self.__calculate_payslip(employee_data.query_result)
+
+    def __calculate_payslip(self, query_result):
+        """
+        Pass an employee record to the PayCalculator class.
+
+        Parameters:
+            query_result: The employee details and tax data from the employee query
+
+        Returns:
+            query_result(Row), results(tuple[str, str, str, str]): The employee record and the rounded calculation results
+        """
+        from payslip_cache import calculate_payslip
+
+        return calculate_payslip(query_result)
+
+    def __show_payslip(self, payslip: tuple):
+        """
+        Replace the loading message with the employee record and calculation results.
+
+        Parameters:
+            payslip: The employee record and rounded calculation results from the background task
+        """
+        build_start = time.perf_counter()
+        query_result, results = payslip
 
         employee_id, first_name, last_name, hourly_rate, country, \
         tfn, threshold_claimed, hours_worked, date_submitted = query_result
@@ -71,8 +179,7 @@ class PayslipView(Page):
                                  '\nTax threshold claimed: ' + str(threshold_claimed) +
                                  '\nCountry of residence: ' + country)
 
-        pay_calculator = PayCalculator(hourly_rate, hours_worked, tfn, threshold_claimed, country)
-        gross_pay, tax_amount, superannuation, net_pay = pay_calculator.results
+        gross_pay, tax_amount, superannuation, net_pay = results
 
         self.payslip_data = [employee_id, first_name, last_name, date_submitted, \
                              gross_pay, tax_amount, superannuation, net_pay]
@@ -83,21 +190,31 @@ class PayslipView(Page):
                                  '\nNet pay: ' + str(net_pay) + ' AUD')
 
         export_button = tk.Button(self, text='Export as .csv', command=self.__export_payslip)
-        back_button = tk.Button(self, text='Go back', command=self.__go_back)
 
-        self.gui_objects.extend([subtitle, date_info, basic_info, \
-                                 hours_info, tax_info, pay_info,  \
-                                 export_button, back_button])
+        for object in self.gui_objects:
+            object.pack_forget()
+
+        self.loading_label.destroy()
+
+        self.gui_objects = [subtitle, date_info, basic_info, \
+                            hours_info, tax_info, pay_info,  \
+                            export_button, self.back_button]
         
         for object in self.gui_objects:
             object.pack()
 
+        timings.record('payslip_widgets', time.perf_counter() - build_start)
+
     def __export_payslip(self):
         """
         Export the query and calculator results to CSV by using the CsvWriter class and asking the user for an export directory.
 
         Show a confirmation message if the file was exported successfully.
         """
+        from tkinter import messagebox
+        from tkinter import filedialog
+        from file_handler import CsvWriter
+
         export_location = filedialog.askdirectory()
         file_name = self.file_name_template
 
@@ -108,122 +225,612 @@ class PayslipView(Page):
 
     def __go_back(self):
         """
-        Go back to the Summary view.
+        Go back to the Summary view. The ViewManager cancels the payslip query if it is still running and destroys this view.
         """
-        summary = SummaryView(self.database_cursor)
+        self.views.show_summary()
 
-        container = tk.Frame(self)
-        container.pack(fill='both', expand=True)
+class SummaryView(Page):
+    def __init__(self, views: 'ViewManager', database: DatabaseBackend, page_size: int = 200, window_size: int = 1000, \
+                 prefetch: bool = True, prefetch_count: int = 5, prefetch_delay: int = 150):
+        """
+        Display a selectable list of results from the pay summary query, loading rows in the background a page at a time as the user scrolls.
 
-        summary.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
+        At most `window_size` rows are held in the listbox - rows scrolled far out of view are dropped and fetched again if the user scrolls back.
 
-        for object in self.gui_objects:
-            object.pack_forget()
+        With `prefetch`, each page of the pay summary also fetches the employee records for that page in one batched Employees query, so the Payslip view can be shown without another query.
 
-        summary.show()
+        The view is kept by the ViewManager while payslips are shown, so going back doesn't run the pay summary query again - the Refresh button reloads the rows.
 
-class SummaryView(Page):
-    def __init__(self, cursor: Cursor):
-        """
-        Display a selectable list of results from the pay summary query.
+        Selecting a row calculates the payslips of that employee and the next `prefetch_count` rows in the background and keeps them in a PayslipCache, so generating a payslip or moving down the list shows the payslip straight away. The prefetch only starts once the selection has stayed on a row for `prefetch_delay` milliseconds, and replaces any earlier prefetch, so holding an arrow key doesn't queue a task per row.
 
-        Load the GUI elements - subtitle label, listbox, generate button, logout button, format legend label.
+        Once the first page is shown, an EmployeeIndex of every employee's ID and name is built in the background. Typing in the search box filters the list to the matching employees.
+
+        Load the GUI elements - subtitle label, search label, search box, listbox, scrollbar, generate button, export button, refresh button, logout button, format legend label.
 
         Parameters:
-            cursor: The database cursor used for executing queries in the PaySummary class
+            views: The ViewManager that shows this view and runs its background tasks
+            database: The database backend used to get a cursor for the pay summary query
+            page_size: The number of rows fetched each time the list needs more rows
+            window_size: The largest number of rows held in the list at once
+            prefetch: Whether to fetch the employee records along with the pay summary
+            prefetch_count: The number of rows after the selected row to calculate payslips for
+            prefetch_delay: How many milliseconds a selection must stay on a row before its payslips are prefetched
         """
-        Page.__init__(self)
+        from query_database import PaySummaryWindow
+        from payslip_cache import PayslipCache
+
+        Page.__init__(self, views)
 
         self.gui_objects = []
-        self.database_cursor = cursor
+        self.database = database
         self.selected_index = None
+        self.exported_count = 0
+        self.export_task = None
+
+        self.page_size = page_size
+        self.window_size = window_size
+        self.prefetch = prefetch
+        self.employee_records = {}
+        self.prefetch_count = prefetch_count
+        self.prefetch_delay = prefetch_delay
+        self.prefetch_after_id = None
+        self.prefetch_task = None
+        self.payslip_cache = PayslipCache()
+        self.loading = False
+        self.loaded_time = time.monotonic()
+        self.summary_window = PaySummaryWindow(self.__open_summary_pages, window_size)
+
+        self.employee_index = None
+        self.index_loading = False
+        self.search_results = None
+
+        self.subtitle = tk.Label(self, text='Loading pay summary...')
+        self.subtitle.pack()
 
-        file_name = 'pay_summary'
+        self.search_text = tk.StringVar()
+        search_label = tk.Label(self, text='Search by ID or name')
+        search_entry = tk.Entry(self, textvariable=self.search_text)
+        self.search_text.trace_add('write', self.__search_changed)
 
-        pay_summary = PaySummary(cursor, file_name)
-        query_result = pay_summary.query_result
+        search_label.pack()
+        search_entry.pack()
 
-        self.subtitle = tk.Label(self, text='Weekly pay summary')
-        self.subtitle.pack()
+        self.list_frame = tk.Frame(self)
+        self.scrollbar = tk.Scrollbar(self.list_frame, orient=tk.VERTICAL)
+        self.selectable_list = tk.Listbox(self.list_frame,
+                                     selectmode=tk.BROWSE,
+                                     yscrollcommand=self.__list_scrolled)
+        self.scrollbar.config(command=self.selectable_list.yview)
 
-        summary_variable_object = tk.Variable(value=query_result)
-        self.selectable_list = tk.Listbox(self, 
-                                     listvariable=summary_variable_object,
-                                     selectmode=tk.BROWSE)
-        
-        self.selectable_list.pack(fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        self.selectable_list.pack(side='left', fill='both', expand=True)
+        self.list_frame.pack(fill='both', expand=True)
         self.selectable_list.bind('<<ListboxSelect>>', self.__record_selected)
 
-        generate_button = tk.Button(self, text='Generate a payslip', command=self.__switch_view)
+        self.generate_button = tk.Button(self, text='Generate a payslip', command=self.__switch_view, state=tk.DISABLED)
+        self.export_all_button = tk.Button(self, text='Export all payslips', command=self.__export_all_payslips, state=tk.DISABLED)
+        refresh_button = tk.Button(self, text='Refresh', command=self.__refresh_from_server)
         logout_button = tk.Button(self, text='Log out', command=self.__go_back)
         legend = tk.Label(self, text="Format: (ID, 'First name', 'Last name', Hours worked)")
 
-        self.gui_objects.extend([generate_button, logout_button, legend])
+        self.gui_objects.extend([self.generate_button, self.export_all_button, refresh_button, logout_button, legend])
 
         for object in self.gui_objects:
             object.pack()
 
+        self.__load_next_page()
+
+    def age(self):
+        """
+        Get how long ago the pay summary was loaded.
+
+        Returns:
+            age(float): The number of seconds since the view was created or last refreshed
+        """
+        return time.monotonic() - self.loaded_time
+
+    def refresh(self):
+        """
+        Drop every loaded row and run the pay summary query again from the first page.
+
+        The payslip cache is replaced rather than emptied, so a prefetch that is already running fills the old cache instead of bringing back payslips from before the refresh.
+        """
+        from query_database import PaySummaryWindow
+        from payslip_cache import PayslipCache
+
+        self.pause()
+
+        self.selectable_list.delete(0, tk.END)
+        self.selected_index = None
+        self.employee_records = {}
+        self.payslip_cache = PayslipCache()
+        self.summary_window = PaySummaryWindow(self.__open_summary_pages, self.window_size)
+        self.loaded_time = time.monotonic()
+
+        self.employee_index = None
+        self.search_results = None
+        self.search_text.set('')
+
+        self.subtitle.config(text='Loading pay summary...')
+        self.generate_button.config(state=tk.DISABLED)
+        self.__update_export_button()
+
+        self.__load_next_page()
+
+    def __refresh_from_server(self):
+        """
+        Reload the rows with current data from the server, even if the database backend would otherwise serve them from a local snapshot.
+        """
+        self.database.mark_stale()
+        self.refresh()
+
+    def pause(self):
+        """
+        Cancel any page load still running and close the pay summary query on a worker thread, so its connection goes back to the pool without the main thread waiting for a fetch that is still running. The rows already loaded are kept.
+
+        An export keeps running and still reports when it finishes - the export button stays disabled until then. The query is run again from where the list ends if the user scrolls further.
+        """
+        self.cancel_tasks()
+        self.__cancel_prefetch()
+        self.summary_window.cancel()
+        self.worker.submit(self.summary_window.close, lambda result: None)
+        self.loading = False
+        self.index_loading = False
+        self.__update_export_button()
+
+    def detach_export(self):
+        """
+        Stop showing the progress and result of a running export, leaving it to finish writing in the background. Used when the view is destroyed.
+
+        Returns:
+            future(Future): The running export's future, or None if no export is running
+        """
+        if self.export_task is None:
+            return None
+
+        export_task = self.export_task
+        self.export_task = None
+        export_task.cancel()
+
+        return export_task.future
+
+    def __update_export_button(self):
+        """
+        Enable the export button once rows are loaded, unless an export is already running.
+        """
+        exportable = self.summary_window.rows and self.export_task is None
+        self.export_all_button.config(state=tk.NORMAL if exportable else tk.DISABLED)
+
+    def __open_summary_pages(self):
+        """
+        Check out a cursor and run the pay summary query, yielding pages of rows until the query is finished or the generator is closed. Runs on a worker thread.
+
+        Returns:
+            A generator of lists of pay summary rows
+        """
+        from query_database import PaySummaryStream
+
+        file_name = 'pay_summary'
+
+        with self.database.cursor(file_name) as cursor:
+            pay_summary = PaySummaryStream(cursor, self.database.query_name(file_name), self.page_size)
+            yield from pay_summary.pages
+
+    def __fetch_next_page(self):
+        """
+        Fetch the page after the list and, when prefetching, its employee records. Runs on a worker thread.
+
+        Returns:
+            page(list), employee_records(dict): The pay summary rows and their employee records, keyed by employee ID
+        """
+        page = self.summary_window.next_page()
+        return page, self.__fetch_employee_records(page)
+
+    def __fetch_previous_page(self):
+        """
+        Fetch the rows before the list and, when prefetching, their employee records. Runs on a worker thread.
+
+        Returns:
+            page(list), employee_records(dict): The pay summary rows and their employee records, keyed by employee ID
+        """
+        page = self.summary_window.previous_page(self.page_size)
+        return page, self.__fetch_employee_records(page)
+
+    def __fetch_employee_records(self, page: list):
+        """
+        Fetch the employee records for a page returned to the list in one batched Employees query. Runs on a worker thread.
+
+        Only pages that are shown are fetched for - rows skipped while the query is run again to reach a page are not. The records are merged into `employee_records` on the main thread.
+
+        Parameters:
+            page: The pay summary rows
+
+        Returns:
+            employee_records(dict): The employee records not already held, keyed by employee ID
+        """
+        from query_database import Employees
+
+        known_records = self.employee_records
+        missing_ids = [row[0] for row in page if row[0] not in known_records]
+
+        if not self.prefetch or not missing_ids:
+            return {}
+
+        file_name = 'employee_information'
+
+        with self.database.cursor(file_name) as cursor:
+            employee_data = Employees(cursor, self.database.query_name(file_name), missing_ids, self.page_size)
+
+        return {employee_record[0]: employee_record for employee_record in employee_data.query_result}
+
+    def __drop_employee_records(self):
+        """
+        Forget the prefetched employee records for rows that are no longer in the list.
+        """
+        if self.prefetch:
+            self.employee_records = {row[0]: self.employee_records[row[0]] for row in self.summary_window.rows \
+                                     if row[0] in self.employee_records}
+
+    def __list_scrolled(self, first: str, last: str):
+        """
+        Update the scrollbar and load the next or previous page when the visible rows get close to either end of the list.
+
+        Parameters:
+            first: The fraction of the list above the visible rows
+            last: The fraction of the list up to the bottom of the visible rows
+        """
+        self.scrollbar.set(first, last)
+
+        if self.loading or self.search_results is not None:
+            return
+
+        if float(last) > 0.9 and not self.summary_window.finished:
+            self.__load_next_page()
+        elif float(first) < 0.1 and self.summary_window.first_row > 0:
+            self.__load_previous_page()
+
+    def __load_next_page(self):
+        """
+        Fetch the next page of the pay summary in the background.
+        """
+        self.loading = True
+        self.run_in_background(self.__fetch_next_page, self.__show_next_page)
+
+    def __load_previous_page(self):
+        """
+        Fetch the rows before the first row in the list in the background.
+        """
+        self.loading = True
+        self.run_in_background(self.__fetch_previous_page, self.__show_previous_page)
+
+    def __show_next_page(self, fetched_page: tuple):
+        """
+        Add a page to the end of the listbox, dropping rows from the start if the list is full, and enable the payslip buttons.
+
+        Parameters:
+            fetched_page: The pay summary rows and their employee records from the background task
+        """
+        build_start = time.perf_counter()
+        page, employee_records = fetched_page
+        self.employee_records.update(employee_records)
+        top_index = self.selectable_list.nearest(0)
+        removed_count = self.summary_window.append(page)
+
+        if self.search_results is None:
+            if page:
+                self.selectable_list.insert(tk.END, *[str(tuple(row)) for row in page])
+
+            if removed_count:
+                self.selectable_list.delete(0, removed_count - 1)
+                self.selectable_list.yview(max(top_index - removed_count, 0))
+
+            self.subtitle.config(text='Weekly pay summary')
+
+        if removed_count:
+            self.__drop_employee_records()
+
+        self.generate_button.config(state=tk.NORMAL)
+        self.__update_export_button()
+        self.loading = False
+
+        if self.employee_index is None and not self.index_loading:
+            self.__load_index()
+
+        timings.record('summary_widgets', time.perf_counter() - build_start)
+
+    def __show_previous_page(self, fetched_page: tuple):
+        """
+        Add a page to the start of the listbox, dropping rows from the end if the list is full.
+
+        Parameters:
+            fetched_page: The pay summary rows and their employee records from the background task
+        """
+        page, employee_records = fetched_page
+        self.employee_records.update(employee_records)
+
+        top_index = self.selectable_list.nearest(0)
+        removed_count = self.summary_window.prepend(page)
+
+        if page and self.search_results is None:
+            self.selectable_list.insert(0, *[str(tuple(row)) for row in page])
+            self.selectable_list.delete(len(self.summary_window.rows), tk.END)
+            self.selectable_list.yview(top_index + len(page))
+
+        if removed_count:
+            self.__drop_employee_records()
+
+        self.loading = False
+
+    def __load_index(self):
+        """
+        Build the search index over every employee in the background.
+        """
+        self.index_loading = True
+        self.run_in_background(self.__build_index, self.__show_index)
+
+    def __build_index(self):
+        """
+        Run the pay summary query on its own cursor and index every row by employee ID, first name and last name. Runs on a worker thread.
+
+        Returns:
+            employee_index(EmployeeIndex): The search index
+        """
+        from query_database import PaySummaryStream
+        from employee_index import EmployeeIndex
+
+        file_name = 'pay_summary'
+
+        with self.database.cursor(file_name) as cursor:
+            pay_summary = PaySummaryStream(cursor, self.database.query_name(file_name))
+            rows = [row for page in pay_summary.pages for row in page]
+
+        with timings.time('search_index'):
+            employee_index = EmployeeIndex(rows)
+
+        return employee_index
+
+    def __show_index(self, employee_index):
+        """
+        Keep the finished search index and run any search typed while it was being built.
+
+        Parameters:
+            employee_index: The EmployeeIndex from the background task
+        """
+        self.employee_index = employee_index
+        self.index_loading = False
+
+        if self.search_text.get().strip():
+            self.__search_changed()
+
+    def __search_changed(self, *arguments):
+        """
+        Filter the list to the employees matching the search box, or go back to the paged pay summary when the search box is cleared.
+
+        Parameters:
+            arguments: The variable name, index and operation passed by the `trace_add` callback (not used)
+        """
+        text = self.search_text.get()
+
+        if not text.strip():
+            if self.search_results is not None:
+                self.search_results = None
+                self.__show_rows(self.summary_window.rows)
+                self.subtitle.config(text='Weekly pay summary')
+
+            return
+
+        if self.employee_index is None:
+            if not self.index_loading:
+                self.__load_index()
+
+            self.subtitle.config(text='Building the search index...')
+            return
+
+        with timings.time('summary_search'):
+            self.search_results = self.employee_index.search(text, self.window_size)
+
+        self.__show_rows(self.search_results)
+        self.subtitle.config(text='Matching employees')
+
+    def __show_rows(self, rows: list):
+        """
+        Replace every row in the listbox and clear the selection.
+
+        Parameters:
+            rows: The pay summary rows to show
+        """
+        self.selectable_list.delete(0, tk.END)
+
+        if rows:
+            self.selectable_list.insert(tk.END, *[str(tuple(row)) for row in rows])
+
+        self.selectable_list.yview(0)
+        self.selected_index = None
+
     def __record_selected(self, event):
         """
-        Get the row selected from the listbox and determine the employee ID using the StringFormatter class.
+        Get the row selected from the listbox and take the employee ID from the matching pay summary row or search result, then start prefetching the payslips of that row and the rows below it.
 
         Parameters:
             event: The binding event that triggers this function - in this case, the binding sequence is `<<ListBoxSelect>>`
         """
         widget = event.widget
         self.selected_index = widget.curselection()
-        selected_record = widget.get(self.selected_index[0])
+        rows = self.summary_window.rows if self.search_results is None else self.search_results
+
+        if self.selected_index:
+            index = self.selected_index[0]
+            self.employee_id = rows[index][0]
+
+            employee_ids = [row[0] for row in rows[index:index + self.prefetch_count + 1]]
+
+            self.__cancel_prefetch()
+            self.prefetch_after_id = self.after(self.prefetch_delay, self.__prefetch_payslips, employee_ids)
+
+    def __cancel_prefetch(self):
+        """
+        Cancel a prefetch that is waiting for the selection to settle, and a prefetch task that hasn't started yet.
+        """
+        if self.prefetch_after_id is not None:
+            self.after_cancel(self.prefetch_after_id)
+            self.prefetch_after_id = None
+
+        if self.prefetch_task is not None:
+            self.prefetch_task.cancel()
+            self.prefetch_task = None
+
+    def __prefetch_payslips(self, employee_ids: list):
+        """
+        Calculate the payslips of the given employees on the background worker and keep them in the payslip cache, skipping any that are already cached.
 
-        string_formatter = StringFormatter(selected_record)
-        individual_entries = string_formatter.individual_entries
-        self.employee_id = individual_entries[0]
+        A prefetch is only a head start - if it fails, the Payslip view runs the query itself and reports the error.
+
+        Parameters:
+            employee_ids: The employee IDs of the selected row and the rows below it
+        """
+        self.prefetch_after_id = None
+
+        if all(employee_id in self.payslip_cache for employee_id in employee_ids):
+            return
+
+        file_name = 'employee_information'
+        open_cursor = partial(self.database.cursor, file_name)
+
+        prefetch = partial(self.payslip_cache.prefetch, employee_ids, open_cursor, dict(self.employee_records), \
+                           self.database.query_name(file_name), self.prefetch_count + 1)
+        self.prefetch_task = self.worker.submit(prefetch, lambda prefetched_count: None)
 
     def __switch_view(self):
         """
         Show an error message if the user tries to generate a payslip without an employee selected, otherwise load the Payslip view.
         """
+        from tkinter import messagebox
+
         if not self.selected_index:
             messagebox.showerror('Error', 'Please select an employee')
         else:
-            container = tk.Frame(self)
-            container.pack(fill='both', expand=True)
+            employee_record = self.employee_records.get(self.employee_id)
+            payslip = self.payslip_cache.get(self.employee_id)
+            self.views.show_payslip(self.employee_id, employee_record, payslip)
+
+    def __export_all_payslips(self):
+        """
+        Export a payslip for every employee in the pay summary after asking the user for a single export directory.
 
-            payslip = PayslipView(self.database_cursor, self.employee_id)
-            payslip.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
+        The user can choose one combined CSV or one CSV per employee. Employee IDs are streamed from the pay summary query through the Employees query and the batch pay calculator to the PayslipExporter class on the background worker, with progress shown in the subtitle.
 
-            self.subtitle.pack_forget()
-            self.selectable_list.pack_forget()
+        The export task is kept apart from the view's other tasks, so showing a payslip or refreshing the list doesn't cancel its result message.
+        """
+        from tkinter import messagebox
+        from tkinter import filedialog
 
-            for object in self.gui_objects:
-                object.pack_forget()
-            
-            payslip.show()
+        export_location = filedialog.askdirectory()
 
-    def __go_back(self):
+        if not export_location:
+            return
+
+        combined = messagebox.askyesno('Export all payslips', 'Export every payslip to one combined file?' +
+                                       '\n\nChoose "No" to export one file per employee.')
+
+        if combined:
+            export_path = export_location + '/payslips_' + str(date.today()) + '.csv'
+        else:
+            export_path = export_location
+
+        self.exported_count = 0
+        self.export_task = self.worker.submit(partial(self.__export_payslips, export_path, combined), \
+                                              self.__show_export_complete, self.__show_export_error, self.__show_export_progress)
+        self.__update_export_button()
+
+    def __export_payslips(self, export_path: str, combined: bool):
         """
-        Go back to the Login view.
+        Stream every employee's payslip to the export location. Runs on a worker thread.
+
+        Parameters:
+            export_path: The combined CSV file path, or the export directory
+            combined: Whether to write every payslip to one file
+
+        Returns:
+            export_path(str), exported_count(int): The export location and the number of payslips written
         """
-        login = LoginView(self)
+        from query_database import PaySummaryStream
+        from file_handler import PayslipExporter
+        from pay_run import fetch_employee_rows, generate_payslips
 
-        container = tk.Frame(self)
-        container.pack(fill='both', expand=True)
+        file_name = 'pay_summary'
+        employee_file_name = 'employee_information'
 
-        login.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
+        with self.database.cursor(file_name) as summary_cursor, self.database.cursor(employee_file_name) as cursor:
+            pay_summary = PaySummaryStream(summary_cursor, self.database.query_name(file_name))
+            employee_ids = (row[0] for page in pay_summary.pages for row in page)
 
-        self.subtitle.pack_forget()
-        self.selectable_list.pack_forget()
+            employee_rows = fetch_employee_rows(cursor, employee_ids, self.database.query_name(employee_file_name))
+            payslips = generate_payslips(employee_rows)
 
-        for object in self.gui_objects:
-            object.pack_forget()
+            exporter = PayslipExporter(payslips, export_path, combined, self.__record_export_progress)
+
+        return export_path, exporter.exported_count
+
+    def __record_export_progress(self, exported_count: int):
+        """
+        Keep the latest export count for the main thread to display. Called from the worker thread.
+
+        Parameters:
+            exported_count: The number of payslips written by the PayslipExporter class
+        """
+        self.exported_count = exported_count
+
+    def __show_export_progress(self):
+        """
+        Show how many payslips have been exported so far in the subtitle.
+        """
+        self.subtitle.config(text='Exported ' + str(self.exported_count) + ' payslips')
+
+    def __show_export_complete(self, export_result: tuple):
+        """
+        Restore the subtitle and show a confirmation message once every payslip has been exported.
+
+        Parameters:
+            export_result: The export location and the number of payslips written
+        """
+        from tkinter import messagebox
+
+        export_path, exported_count = export_result
 
-        login.show()
+        self.export_task = None
+        self.subtitle.config(text='Weekly pay summary')
+        self.__update_export_button()
+
+        messagebox.showinfo('Payslips exported', str(exported_count) + ' payslips were exported to:\n' + export_path)
+
+    def __show_export_error(self, error: BaseException):
+        """
+        Restore the subtitle and export button and show an error message if the export failed.
+
+        Parameters:
+            error: The exception raised by the export
+        """
+        self.export_task = None
+        self.subtitle.config(text='Weekly pay summary')
+        self.__update_export_button()
+
+        self.show_error(error)
+
+    def __go_back(self):
+        """
+        Go back to the Login view. The ViewManager cancels any query still running, closes the connection pool and destroys this view.
+        """
+        self.views.log_out()
 
 class LoginView(Page):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, views: 'ViewManager'):
         """
         Load the GUI elements - username entry, password entry, login button.
+
+        Parameters:
+            views: The ViewManager that shows this view
         """
-        Page.__init__(self, *args, **kwargs)
+        Page.__init__(self, views)
         self.gui_objects = []
 
         self.username_input = tk.Entry(self)
@@ -235,30 +842,160 @@ class LoginView(Page):
 
         for object in self.gui_objects:
             object.pack()
-    
+
+    def clear(self):
+        """
+        Empty the password entry, so the last login isn't left in the window after logging out.
+        """
+        self.password_input.delete(0, tk.END)
+
     def __login(self):
         """
-        Get the user inputs to pass to the DatabaseConnection class, pass the resulting database cursor to the Summary view, and load the Summary view.
+        Get the user inputs to open a ConnectionPool and pass the pool to the ViewManager to load the Summary view.
+
+        If the `CEDARWOOD_SNAPSHOT` environment variable names a SQLite file, the pool is wrapped in a SnapshotBackend so the pay summary and employee records are read from a local snapshot of the server. If the server can't be reached, the last snapshot is opened offline instead.
+
+        Show an error message if either input is missing, or the server connection fails and there is no snapshot to fall back to.
         """
+        from tkinter import messagebox
+
         username_string = self.username_input.get()
         password_string = self.password_input.get()
 
         if not username_string or not password_string:
             messagebox.showerror('Error', 'Please enter username and password')
+            return
 
-        database = DatabaseConnection(username_string, password_string)
-        database_cursor = database.connection
+        snapshot_path = os.environ.get('CEDARWOOD_SNAPSHOT')
+        server_error = None
 
-        container = tk.Frame(self)
-        container.pack(fill='both', expand=True)
+        try:
+            database = ConnectionPool(partial(connect_sql_server, username_string, password_string))
+        except exceptions.ConnectionError as error:
+            if not snapshot_path:
+                messagebox.showerror('Error', 'Could not connect to the server:\n' + str(error))
+                return
 
-        summary = SummaryView(database_cursor)
-        summary.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
+            database = None
+            server_error = error
 
-        for object in self.gui_objects:
-            object.pack_forget()
+        if snapshot_path:
+            from snapshot_database import SnapshotBackend
+
+            try:
+                database = SnapshotBackend(snapshot_path, database)
+            except exceptions.ConnectionError as error:
+                messagebox.showerror('Error', 'Could not connect to the server:\n' + str(server_error) + '\n\n' + str(error))
+                return
+
+            if server_error is not None:
+                messagebox.showwarning('Offline', 'Could not connect to the server, so the last saved snapshot is shown:\n' + str(server_error))
+
+        self.views.log_in(database)
+
+class ViewManager:
+    def __init__(self, container: tk.Frame, worker: BackgroundWorker, summary_ttl: float = 300):
+        """
+        Keep one instance of each view in the container and raise the one being shown, instead of building new views inside new frames on every navigation.
 
-        summary.show()
+        The Summary view keeps its rows while payslips are shown and only reloads them once they are older than `summary_ttl` seconds (or the user presses Refresh). A Payslip view is destroyed as soon as the user leaves it.
+
+        Parameters:
+            container: The frame every view is placed in
+            worker: The background worker shared by every view
+            summary_ttl: How many seconds the pay summary rows are reused before going back to the Summary view reloads them
+        """
+        self.container = container
+        self.worker = worker
+        self.summary_ttl = summary_ttl
+
+        self.database = None
+        self.login_view = None
+        self.summary_view = None
+        self.payslip_view = None
+
+    def show_login(self):
+        """
+        Show the Login view, creating it the first time.
+        """
+        if self.login_view is None:
+            self.login_view = LoginView(self)
+
+        self.login_view.clear()
+        self.login_view.show()
+
+    def log_in(self, database: DatabaseBackend):
+        """
+        Keep the database backend opened by the Login view and show the Summary view.
+
+        Parameters:
+            database: The connection pool, or snapshot backend, for the logged in user
+        """
+        self.database = database
+        self.show_summary()
+
+    def show_summary(self):
+        """
+        Destroy the Payslip view, if there is one, and show the Summary view - creating it after login, and reloading its rows if they are older than the time-to-live.
+        """
+        self.__destroy_payslip_view()
+
+        if self.summary_view is None:
+            self.summary_view = SummaryView(self, self.database)
+        elif self.summary_view.age() > self.summary_ttl:
+            self.summary_view.refresh()
+
+        self.summary_view.show()
+
+    def show_payslip(self, id: int, employee_record = None, payslip: tuple = None):
+        """
+        Pause the Summary view and show a new Payslip view for an employee.
+
+        Parameters:
+            id: The employee ID selected in the Summary view
+            employee_record: The employee's prefetched `employee_information` row, if there is one
+            payslip: The employee's prefetched record and calculation results, if there are any
+        """
+        self.__destroy_payslip_view()
+        self.summary_view.pause()
+
+        self.payslip_view = PayslipView(self, self.database, id, employee_record, payslip)
+        self.payslip_view.show()
+
+    def log_out(self):
+        """
+        Destroy the Summary and Payslip views, close the connection pool and show the Login view.
+
+        An export that is still running is left to finish writing, and the pool is only closed once it has.
+        """
+        self.__destroy_payslip_view()
+        export_future = None
+
+        if self.summary_view is not None:
+            self.summary_view.pause()
+            export_future = self.summary_view.detach_export()
+            self.summary_view.destroy()
+            self.summary_view = None
+
+        if self.database is not None:
+            if export_future is not None:
+                database = self.database
+                export_future.add_done_callback(lambda future: database.close())
+            else:
+                self.database.close()
+
+            self.database = None
+
+        self.show_login()
+
+    def __destroy_payslip_view(self):
+        """
+        Cancel the Payslip view's query if it is still running and destroy its widgets.
+        """
+        if self.payslip_view is not None:
+            self.payslip_view.cancel_tasks()
+            self.payslip_view.destroy()
+            self.payslip_view = None
 
 class MainView(tk.Frame):
     def __init__(self, *args, **kwargs):
@@ -267,19 +1004,29 @@ class MainView(tk.Frame):
         """
         tk.Frame.__init__(self, *args, **kwargs)
 
-        login = LoginView(self)
+        self.worker = BackgroundWorker(self.winfo_toplevel())
 
         title_frame = tk.Frame(self)
         container = tk.Frame(self)
+        self.status_bar = tk.Label(self, anchor='w', relief=tk.SUNKEN, font=('TkDefaultFont', 8))
 
         title_frame.pack()
+        self.status_bar.pack(side='bottom', fill='x')
         container.pack(fill='both', expand=True)
 
-        login.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
-
         title = tk.Label(title_frame, text='🌳\nCedarwood')
         title.pack(side='top', fill='both', expand=True)
 
-        login.show()
+        self.views = ViewManager(container, self.worker)
+        self.views.show_login()
+        self.__update_status_bar()
+
+    def __update_status_bar(self, refresh_interval: int = 1000):
+        """
+        Show the stages that have taken the most time so far in the status bar, refreshing every `refresh_interval` milliseconds.
 
-InitialiseWindow()
\ No newline at end of file
+        Parameters:
+            refresh_interval: How many milliseconds to wait between refreshes
+        """
+        self.status_bar.config(text=timings.status_text())
+        self.after(refresh_interval, self.__update_status_bar)
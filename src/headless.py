@@ -0,0 +1,262 @@
+import os
+import sys
+import argparse
+import multiprocessing
+from datetime import date
+from functools import partial
+
+import exceptions
+from connect_database import connect_sql_server
+from query_database import PaySummaryStream
+from file_handler import PayslipExporter, EXPORT_FORMATS, get_export_format
+from pay_run import fetch_employee_rows, generate_payslips, ShardedPayRun, PayRunSnapshot, IncrementalPayRun
+from write_back import PayslipWriter
+from instrumentation import timings, profile_action
+
+EXIT_SUCCESS = 0
+EXIT_CONNECTION_ERROR = 1
+EXIT_USAGE_ERROR = 2
+EXIT_RUN_ERROR = 3
+
+def read_credentials(credentials_file: str = None):
+    """
+    Get the server login from a credentials file, or from the `CEDARWOOD_USERNAME` and `CEDARWOOD_PASSWORD` environment variables.
+
+    The credentials file has the username on the first line and the password on the second line.
+
+    Parameters:
+        credentials_file: The path of the credentials file (optional)
+
+    Returns:
+        username(str), password(str): The server login, or None for any value that wasn't found
+
+    Exceptions:
+        exceptions.FileNotFoundError: The credentials file couldn't be read because it wasn't in the specified location
+    """
+    if credentials_file:
+        try:
+            with open(credentials_file, mode='r', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+
+        except FileNotFoundError as error:
+            raise exceptions.FileNotFoundError(error)
+
+        username = lines[0].strip() if len(lines) > 0 else None
+        password = lines[1] if len(lines) > 1 else None
+        return username, password
+
+    return os.environ.get('CEDARWOOD_USERNAME'), os.environ.get('CEDARWOOD_PASSWORD')
+
+def fetch_employee_ids(connection):
+    """
+    Get every employee ID from the pay summary query.
+
+    Parameters:
+        connection: An open database connection
+
+    Returns:
+        employee_ids(list): The employee IDs in pay summary order
+    """
+    cursor = connection.cursor()
+
+    try:
+        pay_summary = PaySummaryStream(cursor, 'pay_summary')
+        employee_ids = [row[0] for page in pay_summary.pages for row in page]
+
+    finally:
+        cursor.close()
+
+    return employee_ids
+
+def run_pay_run(connection, export_path: str, combined: bool = True, progress_callback = None, \
+                connection_factory = None, worker_count: int = 1, snapshot_path: str = None, export_format: str = 'csv', \
+                save_results: bool = False):
+    """
+    Run the full pay summary, pay calculation and export pipeline for every employee.
+
+    With more than one worker, employees are split into ID-range shards and calculated in parallel processes by the ShardedPayRun class.
+
+    With a snapshot file, only employees whose timesheet has changed since the last run are fetched and calculated by the IncrementalPayRun class (the worker count is ignored).
+
+    With `save_results`, every payslip is also saved to the pay results table by the PayslipWriter class as it is exported.
+
+    Parameters:
+        connection: An open database connection
+        export_path: The combined CSV file path, or the export directory when writing one file per employee
+        combined: Whether to write every payslip to one file
+        progress_callback: An optional function called with the number of payslips written so far
+        connection_factory: A picklable function that opens a new connection in each worker process (needed when `worker_count` is more than 1)
+        worker_count: The number of worker processes
+        snapshot_path: The JSON file holding the payslips from the last incremental run (optional)
+        export_format: The export format name - `csv`, `csv.gz` or `parquet`
+        save_results: Whether to save every payslip to the pay results table
+
+    Returns:
+        exported_count(int): The number of payslips written
+    """
+    if snapshot_path:
+        return run_incremental_pay_run(connection, export_path, combined, progress_callback, snapshot_path, export_format, \
+                                       save_results)
+
+    employee_ids = fetch_employee_ids(connection)
+
+    if worker_count > 1:
+        sharded_pay_run = ShardedPayRun(connection_factory, employee_ids, worker_count)
+        payslips = save_while_exporting(connection, sharded_pay_run.payslips, save_results)
+
+        exporter = PayslipExporter(payslips, export_path, combined, progress_callback, export_format=export_format)
+        return exporter.exported_count
+
+    employee_cursor = connection.cursor()
+
+    try:
+        employee_rows = fetch_employee_rows(employee_cursor, employee_ids)
+        payslips = save_while_exporting(connection, generate_payslips(employee_rows), save_results)
+
+        exporter = PayslipExporter(payslips, export_path, combined, progress_callback, export_format=export_format)
+        return exporter.exported_count
+
+    finally:
+        employee_cursor.close()
+
+def run_incremental_pay_run(connection, export_path: str, combined: bool, progress_callback, snapshot_path: str, \
+                            export_format: str = 'csv', save_results: bool = False):
+    """
+    Recalculate the employees with changed timesheets, reuse the saved payslips for everyone else and export every payslip.
+
+    Parameters:
+        connection: An open database connection
+        export_path: The combined CSV file path, or the export directory when writing one file per employee
+        combined: Whether to write every payslip to one file
+        progress_callback: An optional function called with the number of payslips written so far
+        snapshot_path: The JSON file holding the payslips from the last incremental run
+        export_format: The export format name - `csv`, `csv.gz` or `parquet`
+        save_results: Whether to save every payslip to the pay results table
+
+    Returns:
+        exported_count(int): The number of payslips written
+    """
+    cursor = connection.cursor()
+
+    try:
+        incremental_pay_run = IncrementalPayRun(cursor, PayRunSnapshot(snapshot_path))
+
+    finally:
+        cursor.close()
+
+    print(str(incremental_pay_run.changed_count) + ' payslips were recalculated and ' +
+          str(incremental_pay_run.reused_count) + ' were reused from: ' + snapshot_path)
+
+    payslips = save_while_exporting(connection, incremental_pay_run.payslips, save_results)
+
+    exporter = PayslipExporter(payslips, export_path, combined, progress_callback, export_format=export_format)
+    return exporter.exported_count
+
+def save_while_exporting(connection, payslips, save_results: bool):
+    """
+    Pass the payslips through a PayslipWriter when they should be saved to the pay results table.
+
+    Parameters:
+        connection: An open database connection
+        payslips: An iterable of payslip data values
+        save_results: Whether to save the payslips
+
+    Returns:
+        The payslips, saved in batches as they are read if `save_results` is set
+    """
+    if not save_results:
+        return payslips
+
+    payslip_writer = PayslipWriter(connection)
+    return payslip_writer.save_while_passing(payslips)
+
+def parse_arguments(arguments: list):
+    """
+    Read the command-line options.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name
+
+    Returns:
+        The parsed options
+    """
+    parser = argparse.ArgumentParser(description='Run a Cedarwood pay run without the GUI and export every payslip.')
+    parser.add_argument('export_directory', help='the directory to export payslips to')
+    parser.add_argument('--credentials', help='a file with the server username on the first line and the password on the second line ' +
+                                              '(defaults to the CEDARWOOD_USERNAME and CEDARWOOD_PASSWORD environment variables)')
+    parser.add_argument('--per-employee', action='store_true', help='write one file per employee instead of one combined file')
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='the export format - plain CSV, gzip-compressed CSV or Parquet (needs pyarrow) (default csv)')
+    parser.add_argument('--workers', type=int, default=1, help='the number of worker processes to split the pay run across (default 1)')
+    parser.add_argument('--save-results', action='store_true', help='also save every payslip to the pay results table')
+    parser.add_argument('--snapshot', help='a JSON file of saved payslips - only employees whose timesheet changed since the last run are recalculated')
+
+    return parser.parse_args(arguments)
+
+def main(arguments: list = None):
+    """
+    Connect to the server, run the pay run and report the result. This module never imports tkinter, so it can run on a server with no display.
+
+    Parameters:
+        arguments: The command-line arguments, without the program name (defaults to `sys.argv`)
+
+    Returns:
+        The exit status - 0 for success, 1 for a connection failure, 2 for missing credentials, options or export libraries, 3 for a failed pay run
+    """
+    options = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+
+    try:
+        username, password = read_credentials(options.credentials)
+    except exceptions.FileNotFoundError as error:
+        print('Could not read the credentials file: ' + str(error), file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    if not username or not password:
+        print('No server login found - set CEDARWOOD_USERNAME and CEDARWOOD_PASSWORD or pass --credentials', file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    if not os.path.isdir(options.export_directory):
+        print('The export directory does not exist: ' + options.export_directory, file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    try:
+        export_class = get_export_format(options.format)
+    except exceptions.ExportFormatError as error:
+        print(str(error), file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    combined = not options.per_employee
+
+    if combined:
+        export_path = os.path.join(options.export_directory, 'payslips_' + str(date.today()) + export_class.extension)
+    else:
+        export_path = options.export_directory
+
+    try:
+        connection = connect_sql_server(username, password)
+    except exceptions.ConnectionError as error:
+        print('Could not connect to the server: ' + str(error), file=sys.stderr)
+        return EXIT_CONNECTION_ERROR
+
+    try:
+        connection_factory = partial(connect_sql_server, username, password)
+        with profile_action('headless_pay_run'):
+            exported_count = run_pay_run(connection, export_path, combined, None, connection_factory, options.workers, options.snapshot, options.format, options.save_results)
+
+    except exceptions.ConnectionError as error:
+        print('A worker could not connect to the server: ' + str(error), file=sys.stderr)
+        return EXIT_CONNECTION_ERROR
+
+    except (Exception, exceptions.FileNotFoundError, exceptions.TaxTableFormatError) as error:
+        print('The pay run failed: ' + str(error), file=sys.stderr)
+        return EXIT_RUN_ERROR
+
+    finally:
+        connection.close()
+        timings.dump_if_requested()
+
+    print(str(exported_count) + ' payslips were exported to: ' + export_path)
+    return EXIT_SUCCESS
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import os
+import csv
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+
+HISTOGRAM_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+PROFILE_DIRECTORY_VARIABLE = 'CEDARWOOD_PROFILE'
+TIMINGS_FILE_VARIABLE = 'CEDARWOOD_TIMINGS_FILE'
+
+class StageTimer:
+    __slots__ = ('count', 'total', 'maximum', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * len(HISTOGRAM_BUCKETS_MS)
+
+    def record(self, seconds: float):
+        """
+        Add one timing to the count, total and latency histogram.
+
+        Parameters:
+            seconds: How long the stage took
+        """
+        milliseconds = seconds * 1000
+
+        self.count += 1
+        self.total += milliseconds
+
+        if milliseconds > self.maximum:
+            self.maximum = milliseconds
+
+        for index, upper_bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if milliseconds <= upper_bound:
+                self.histogram[index] += 1
+                break
+
+class StageTimings:
+    def __init__(self):
+        """
+        Keep a count and latency histogram for each named stage of a user action, e.g. `execute`, `fetchone`, `pay_calculator`.
+        """
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Time the body of a `with` block and record it under a stage name.
+
+        Parameters:
+            stage: The stage name
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float):
+        """
+        Record one timing for a stage. Safe to call from worker threads.
+
+        Parameters:
+            stage: The stage name
+            seconds: How long the stage took
+        """
+        with self.lock:
+            stage_timer = self.stages.get(stage)
+
+            if stage_timer is None:
+                stage_timer = StageTimer()
+                self.stages[stage] = stage_timer
+
+            stage_timer.record(seconds)
+
+    def summary(self):
+        """
+        Get the count, total, mean, maximum and histogram of every stage.
+
+        Returns:
+            summary(dict[str, dict]): The timings in milliseconds, keyed by stage name
+        """
+        with self.lock:
+            summary = {}
+
+            for stage, stage_timer in self.stages.items():
+                summary[stage] = {'count': stage_timer.count,
+                                  'total_ms': stage_timer.total,
+                                  'mean_ms': stage_timer.total / stage_timer.count,
+                                  'max_ms': stage_timer.maximum,
+                                  'histogram': {format_bucket(upper_bound): count for upper_bound, count \
+                                                in zip(HISTOGRAM_BUCKETS_MS, stage_timer.histogram) if count}}
+
+            return summary
+
+    def status_text(self, stage_count: int = 3):
+        """
+        Get a one-line description of the stages that have taken the most time, for the GUI status bar.
+
+        Parameters:
+            stage_count: The number of stages to include
+
+        Returns:
+            The status bar text, e.g. `execute 12x 4.1 ms avg | fetchone 12x 0.2 ms avg`
+        """
+        summary = self.summary()
+        slowest = sorted(summary.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:stage_count]
+
+        return ' | '.join(stage + ' ' + str(values['count']) + 'x ' + format(values['mean_ms'], '.1f') + ' ms avg' \
+                          for stage, values in slowest)
+
+    def dump(self, file_path: str):
+        """
+        Write the timings to a JSON file, or to a CSV file if the path ends in `.csv`.
+
+        Parameters:
+            file_path: The file to write
+        """
+        summary = self.summary()
+
+        if file_path.endswith('.csv'):
+            header = ['Stage', 'Count', 'Total (ms)', 'Mean (ms)', 'Max (ms)'] + \
+                     ['<= ' + format_bucket(upper_bound) + ' ms' for upper_bound in HISTOGRAM_BUCKETS_MS]
+
+            with open(file_path, mode='w', newline='') as csv_file:
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(header)
+
+                for stage, values in summary.items():
+                    histogram = [values['histogram'].get(format_bucket(upper_bound), 0) for upper_bound in HISTOGRAM_BUCKETS_MS]
+                    csv_writer.writerow([stage, values['count'], values['total_ms'], values['mean_ms'], values['max_ms']] + histogram)
+        else:
+            with open(file_path, mode='w') as json_file:
+                json.dump(summary, json_file, indent=2)
+
+    def dump_if_requested(self):
+        """
+        Write the timings to the file named by the `CEDARWOOD_TIMINGS_FILE` environment variable, if it is set.
+        """
+        file_path = os.environ.get(TIMINGS_FILE_VARIABLE)
+
+        if file_path:
+            self.dump(file_path)
+
+    def reset(self):
+        """
+        Remove every recorded timing.
+        """
+        with self.lock:
+            self.stages.clear()
+
+def format_bucket(upper_bound: float):
+    """
+    Get the label of a histogram bucket.
+
+    Parameters:
+        upper_bound: The bucket's upper bound in milliseconds
+
+    Returns:
+        The upper bound as a string, e.g. `2.5` or `inf`
+    """
+    return format(upper_bound, 'g')
+
+timings = StageTimings()
+
+profile_lock = threading.Lock()
+profile_counter = 0
+
+@contextmanager
+def profile_action(action_name: str):
+    """
+    Capture a cProfile of the body of a `with` block when the `CEDARWOOD_PROFILE` environment variable names a directory, writing one `.pstats` file per action.
+
+    Only one action is profiled at a time - actions that start while another is being profiled run without a profile.
+
+    Parameters:
+        action_name: The name used in the pstats file name, e.g. `load_payslip`
+    """
+    global profile_counter
+
+    profile_directory = os.environ.get(PROFILE_DIRECTORY_VARIABLE)
+
+    if not profile_directory or not profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    try:
+        profile_counter += 1
+        file_name = time.strftime('%Y%m%d-%H%M%S') + '_' + str(profile_counter) + '_' + action_name + '.pstats'
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(profile_directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_directory, file_name))
+
+    finally:
+        profile_lock.release()
@@ -1,12 +1,119 @@
-from tax_calculator import TaxCalculator
+import time
+import threading
+from collections import OrderedDict
+
+from tax_calculator import TaxCalculator, get_table_name, RESIDENT_NO_TFN_RATE, FOREIGN_NO_TFN_RATE
 from format_handler import CentRounder
+from file_handler import tax_tables
+from instrumentation import timings
+
+SUPER_PERCENTAGE = 11
+
+class PayCalculationCache:
+    def __init__(self, max_size: int = 4096, registry = tax_tables, check_interval: float = 1.0):
+        """
+        Keep the most recently used pay calculation results, keyed on the inputs the results depend on.
+
+        Results depend only on `(hourly rate, hours worked, tfn present, threshold claimed, residence)`, so employees on the same award rate and hours share an entry. The cache is emptied whenever a tax table file changes on disk or `SUPER_PERCENTAGE` changes.
+
+        Parameters:
+            max_size: The largest number of results kept - the least recently used result is dropped first
+            registry: The TaxTableRegistry whose tables the cached results were calculated from
+            check_interval: The fewest seconds between checks of the tax table files
+        """
+        self.max_size = max_size
+        self.registry = registry
+        self.check_interval = check_interval
+
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.registry_version = registry.version
+        self.super_percentage = SUPER_PERCENTAGE
+        self.last_check = time.monotonic()
+
+    def validate(self):
+        """
+        Empty the cache if `SUPER_PERCENTAGE` has changed, or a tax table file has changed since the last check.
+        """
+        now = time.monotonic()
+
+        if now - self.last_check >= self.check_interval:
+            self.last_check = now
+            self.registry.check_for_changes()
+
+        if self.registry.version != self.registry_version or SUPER_PERCENTAGE != self.super_percentage:
+            with self.lock:
+                self.entries.clear()
+                self.registry_version = self.registry.version
+                self.super_percentage = SUPER_PERCENTAGE
+
+    def get(self, key: tuple):
+        """
+        Get the cached results for a set of inputs, counting a hit or a miss.
+
+        Parameters:
+            key: The `(hourly rate, hours worked, tfn present, threshold claimed, residence)` inputs
+
+        Returns:
+            The cached `(gross pay, tax amount, superannuation, net pay, rounded results)`, or None on a miss
+        """
+        with self.lock:
+            results = self.entries.get(key)
+
+            if results is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+            return results
+
+    def put(self, key: tuple, results: tuple):
+        """
+        Store the results for a set of inputs, dropping the least recently used result if the cache is full.
+
+        Parameters:
+            key: The `(hourly rate, hours worked, tfn present, threshold claimed, residence)` inputs
+            results: The `(gross pay, tax amount, superannuation, net pay, rounded results)` to store
+        """
+        with self.lock:
+            self.entries[key] = results
+            self.entries.move_to_end(key)
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every cached result and reset the hit and miss counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+pay_cache = PayCalculationCache()
 
 class PayCalculator:
     def __init__(self, hourly_rate: int, hours_worked: int, tfn: int, threshold_claimed: bool, residence: str):
-        self.gross_pay = self.__calculate_gross(hourly_rate, hours_worked)
-        self.tax_amount = self.__calculate_tax(tfn, threshold_claimed, residence)
-        self.super_amount = self.__calculate_super()
-        self.results = self.__calculate_results()
+        with timings.time('pay_calculator'):
+            pay_cache.validate()
+
+            cache_key = (hourly_rate, hours_worked, tfn is not None, threshold_claimed, residence)
+            cached_results = pay_cache.get(cache_key)
+
+            if cached_results is not None:
+                self.gross_pay, self.tax_amount, self.super_amount, self.net_pay, self.results = cached_results
+            else:
+                self.gross_pay = self.__calculate_gross(hourly_rate, hours_worked)
+                self.tax_amount = self.__calculate_tax(tfn, threshold_claimed, residence)
+                self.super_amount = self.__calculate_super()
+                self.results = self.__calculate_results()
+
+                pay_cache.put(cache_key, (self.gross_pay, self.tax_amount, self.super_amount, self.net_pay, self.results))
 
     def __calculate_gross(self, hourly_rate: int, hours_worked: int):
         """
@@ -58,7 +165,7 @@ class PayCalculator:
         """
         gross_pay = self.gross_pay
 
-        super_percentage = 11
+        super_percentage = SUPER_PERCENTAGE
 
         superannuation = (gross_pay * super_percentage) / 100
         return superannuation
@@ -75,6 +182,7 @@ class PayCalculator:
         superannuation = self.super_amount
 
         net_pay = gross_pay - tax_amount - superannuation
+        self.net_pay = net_pay
 
         results = [gross_pay, tax_amount, superannuation, net_pay]
 
@@ -82,3 +190,184 @@ class PayCalculator:
         rounded_results = cent_rounder.rounded_results
 
         return rounded_results
+
+class BatchPayCalculator:
+    def __init__(self, hourly_rates: list, hours_worked: list, tfn_present: list, thresholds_claimed: list, residences: list, \
+                 super_percentage: float = None, registry = tax_tables, cache = pay_cache):
+        with timings.time('batch_pay_calculator'):
+            columns = (hourly_rates, hours_worked, tfn_present, thresholds_claimed, residences)
+
+            if super_percentage is None:
+                super_percentage = SUPER_PERCENTAGE
+
+            if cache is not None and registry is cache.registry and super_percentage == SUPER_PERCENTAGE:
+                results = self.__calculate_with_cache(columns, super_percentage, registry, cache)
+            else:
+                results = self.__calculate_columns(columns, super_percentage, registry)
+
+            self.gross_pay, self.tax_amount, self.super_amount, self.net_pay, self.results = results
+
+    def __calculate_columns(self, columns: tuple, super_percentage: float, registry):
+        """
+        Calculate every result column for a batch of employees.
+
+        Parameters:
+            columns: The hourly rate, hours worked, tfn present, threshold claimed and residence columns
+            super_percentage: The super guarantee percentage
+            registry: The TaxTableRegistry to get the tax tables from
+
+        Returns:
+            The gross pay, tax amount, superannuation, net pay and rounded result columns
+        """
+        hourly_rates, hours_worked, tfn_present, thresholds_claimed, residences = columns
+
+        gross_pay = self.__calculate_gross(hourly_rates, hours_worked)
+        tax_amount = self.__calculate_tax(gross_pay, tfn_present, thresholds_claimed, residences, registry)
+        super_amount = self.__calculate_super(gross_pay, super_percentage)
+        net_pay = self.__calculate_net(gross_pay, tax_amount, super_amount)
+        results = self.__round_results(gross_pay, tax_amount, super_amount, net_pay)
+
+        return gross_pay, tax_amount, super_amount, net_pay, results
+
+    def __calculate_with_cache(self, columns: tuple, super_percentage: float, registry, cache: PayCalculationCache):
+        """
+        Calculate the result columns, only running the calculation once for each distinct set of inputs that isn't already in the PayCalculationCache.
+
+        Parameters:
+            columns: The hourly rate, hours worked, tfn present, threshold claimed and residence columns
+            super_percentage: The super guarantee percentage
+            registry: The TaxTableRegistry to get the tax tables from
+            cache: The cache to read and store results in
+
+        Returns:
+            The gross pay, tax amount, superannuation, net pay and rounded result columns
+        """
+        keys = list(zip(*columns))
+
+        if not keys:
+            return [], [], [], [], []
+
+        cache.validate()
+
+        cached_results = [cache.get(key) for key in keys]
+        missing_keys = list(dict.fromkeys(key for key, results in zip(keys, cached_results) if results is None))
+
+        if missing_keys:
+            missing_columns = tuple(list(column) for column in zip(*missing_keys))
+            calculated_columns = self.__calculate_columns(missing_columns, super_percentage, registry)
+            calculated_results = dict(zip(missing_keys, zip(*calculated_columns)))
+
+            for key, results in calculated_results.items():
+                cache.put(key, results)
+
+            cached_results = [calculated_results[key] if results is None else results \
+                              for key, results in zip(keys, cached_results)]
+
+        return tuple(list(column) for column in zip(*cached_results))
+
+    def __calculate_gross(self, hourly_rates: list, hours_worked: list):
+        """
+        Get the weekly gross pay for every employee in the batch.
+
+        Parameters:
+            hourly_rates: The hourly rate column in AUD
+            hours_worked: The hours worked column for the week
+
+        Returns:
+            gross_pay(list[float]): The weekly gross pay column calculated with the formula `hourly rate * hours worked`
+        """
+        gross_pay = [hourly_rate * hours for hourly_rate, hours in zip(hourly_rates, hours_worked)]
+        return gross_pay
+
+    def __calculate_tax(self, gross_pay: list, tfn_present: list, thresholds_claimed: list, residences: list, registry):
+        """
+        Get the tax amount column, grouping employees by tax table so each table is searched once for all of its employees.
+
+        Uses the same formulas as the PayCalculator class so the results match to the cent.
+
+        Parameters:
+            gross_pay: The weekly gross pay column
+            tfn_present: A column of whether each employee has a Tax File Number record
+            thresholds_claimed: The tax-free threshold column (may contain nulls)
+            residences: The country of residence column
+            registry: The TaxTableRegistry to get the tax tables from
+
+        Returns:
+            tax_amount(list[float]): The weekly tax amount column
+
+        Exceptions:
+            ValueError: A gross pay result is above every upper earnings limit in its tax table
+        """
+        tax_amount = [0.0] * len(gross_pay)
+        table_groups = {}
+
+        for index, (has_tfn, threshold_claimed, residence) in enumerate(zip(tfn_present, thresholds_claimed, residences)):
+            if not has_tfn:
+                if residence != 'Australia':
+                    tax_rate = FOREIGN_NO_TFN_RATE
+                else:
+                    tax_rate = RESIDENT_NO_TFN_RATE
+
+                tax_amount[index] = round(gross_pay[index]) * tax_rate
+            else:
+                file_name = get_table_name(threshold_claimed, residence)
+                table_groups.setdefault(file_name, []).append(index)
+
+        for file_name, indexes in table_groups.items():
+            tax_table = registry.get_table(file_name)
+            group_pay = [gross_pay[index] for index in indexes]
+            coefficients_a, coefficients_b = tax_table.lookup_many(group_pay)
+
+            for index, pay, coef_a, coef_b in zip(indexes, group_pay, coefficients_a, coefficients_b):
+                if coef_a is None:
+                    raise ValueError('Gross pay ' + str(pay) + ' is above every upper earnings limit in ' + file_name)
+
+                tax_amount[index] = coef_a * (pay + 0.99) - coef_b
+
+        return tax_amount
+
+    def __calculate_super(self, gross_pay: list, super_percentage: float):
+        """
+        Get the superannuation amount column.
+
+        Parameters:
+            gross_pay: The weekly gross pay column
+            super_percentage: The super guarantee percentage
+
+        Returns:
+            superannuation(list[float]): The weekly superannuation column calculated with the formula `(gross pay * super percentage) / 100`
+        """
+        superannuation = [(pay * super_percentage) / 100 for pay in gross_pay]
+        return superannuation
+
+    def __calculate_net(self, gross_pay: list, tax_amount: list, super_amount: list):
+        """
+        Get the weekly net pay column.
+
+        Parameters:
+            gross_pay: The weekly gross pay column
+            tax_amount: The weekly tax amount column
+            super_amount: The weekly superannuation column
+
+        Returns:
+            net_pay(list[float]): The net pay column calculated with the formula `gross pay - tax amount - superannuation`
+        """
+        net_pay = [pay - tax - superannuation for pay, tax, superannuation in zip(gross_pay, tax_amount, super_amount)]
+        return net_pay
+
+    def __round_results(self, gross_pay: list, tax_amount: list, super_amount: list, net_pay: list):
+        """
+        Format every calculation result to 2 decimal places, in the same way as the CentRounder class.
+
+        Parameters:
+            gross_pay: The weekly gross pay column
+            tax_amount: The weekly tax amount column
+            super_amount: The weekly superannuation column
+            net_pay: The weekly net pay column
+
+        Returns:
+            rounded_results(list[tuple[str, str, str, str]]): The gross pay, tax, superannuation and net pay for each employee
+        """
+        rounded_results = [(format(pay, '.2f'), format(tax, '.2f'), format(superannuation, '.2f'), format(net, '.2f')) \
+                           for pay, tax, superannuation, net in zip(gross_pay, tax_amount, super_amount, net_pay)]
+        return rounded_results
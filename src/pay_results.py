@@ -0,0 +1,141 @@
+from array import array
+from format_handler import to_cents, format_cents
+
+AMOUNT_COLUMNS = ('gross_cents', 'tax_cents', 'super_cents', 'net_cents')
+
+class PayslipRecord:
+    __slots__ = ('employee_id', 'gross_cents', 'tax_cents', 'super_cents', 'net_cents')
+
+    def __init__(self, employee_id: int, gross_cents: int, tax_cents: int, super_cents: int, net_cents: int):
+        self.employee_id = employee_id
+        self.gross_cents = gross_cents
+        self.tax_cents = tax_cents
+        self.super_cents = super_cents
+        self.net_cents = net_cents
+
+    def formatted(self):
+        """
+        Format the record's amounts to 2 decimal places, matching the PayCalculator results.
+
+        Returns:
+            The gross pay, tax amount, superannuation and net pay as strings
+        """
+        return format_cents(self.gross_cents), format_cents(self.tax_cents), \
+               format_cents(self.super_cents), format_cents(self.net_cents)
+
+    def __repr__(self):
+        return 'PayslipRecord(' + str(self.employee_id) + ', ' + ', '.join(self.formatted()) + ')'
+
+class PayRunResults:
+    def __init__(self, employee_ids = (), gross_cents = (), tax_cents = (), super_cents = (), net_cents = ()):
+        """
+        Store a pay run's results as parallel arrays of employee IDs and whole-cent amounts.
+
+        Each column is a signed 64-bit integer array, so a full pay period takes 40 bytes per employee and totals, sorting and slicing never create per-employee objects.
+
+        Parameters:
+            employee_ids: The employee ID column
+            gross_cents: The gross pay column in cents
+            tax_cents: The tax amount column in cents
+            super_cents: The superannuation column in cents
+            net_cents: The net pay column in cents
+        """
+        self.employee_ids = array('q', employee_ids)
+        self.gross_cents = array('q', gross_cents)
+        self.tax_cents = array('q', tax_cents)
+        self.super_cents = array('q', super_cents)
+        self.net_cents = array('q', net_cents)
+
+    def __len__(self):
+        return len(self.employee_ids)
+
+    def __getitem__(self, index):
+        """
+        Get a single record, or a new PayRunResults for a slice.
+
+        Parameters:
+            index: A row index or a slice
+
+        Returns:
+            A PayslipRecord for an index, or a PayRunResults for a slice
+        """
+        if isinstance(index, slice):
+            return PayRunResults(self.employee_ids[index], self.gross_cents[index], self.tax_cents[index], \
+                                 self.super_cents[index], self.net_cents[index])
+
+        return PayslipRecord(self.employee_ids[index], self.gross_cents[index], self.tax_cents[index], \
+                             self.super_cents[index], self.net_cents[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, employee_id: int, gross_cents: int, tax_cents: int, super_cents: int, net_cents: int):
+        """
+        Add one employee's results in cents.
+
+        Parameters:
+            employee_id: The employee ID
+            gross_cents: The gross pay in cents
+            tax_cents: The tax amount in cents
+            super_cents: The superannuation in cents
+            net_cents: The net pay in cents
+        """
+        self.employee_ids.append(employee_id)
+        self.gross_cents.append(gross_cents)
+        self.tax_cents.append(tax_cents)
+        self.super_cents.append(super_cents)
+        self.net_cents.append(net_cents)
+
+    def add_batch(self, employee_ids: list, batch_calculator):
+        """
+        Add every result from a BatchPayCalculator, converting the amounts to cents.
+
+        Parameters:
+            employee_ids: The employee ID column, in the same order as the batch
+            batch_calculator: The BatchPayCalculator holding the float results
+        """
+        self.employee_ids.extend(employee_ids)
+        self.gross_cents.extend(to_cents(amount) for amount in batch_calculator.gross_pay)
+        self.tax_cents.extend(to_cents(amount) for amount in batch_calculator.tax_amount)
+        self.super_cents.extend(to_cents(amount) for amount in batch_calculator.super_amount)
+        self.net_cents.extend(to_cents(amount) for amount in batch_calculator.net_pay)
+
+    def totals(self):
+        """
+        Get the total of every amount column.
+
+        Returns:
+            The gross pay, tax amount, superannuation and net pay totals in cents
+        """
+        return sum(self.gross_cents), sum(self.tax_cents), sum(self.super_cents), sum(self.net_cents)
+
+    def sorted_by(self, column: str = 'employee_ids', reverse: bool = False):
+        """
+        Get a copy of the results sorted by one column.
+
+        Parameters:
+            column: The column name to sort by, e.g. `net_cents`
+            reverse: Whether to sort from largest to smallest
+
+        Returns:
+            A new PayRunResults in sorted order
+        """
+        sort_column = getattr(self, column)
+        order = sorted(range(len(self)), key=sort_column.__getitem__, reverse=reverse)
+
+        return self.take(order)
+
+    def take(self, indexes: list):
+        """
+        Get a copy of the results holding only the rows at the given indexes, in that order.
+
+        Parameters:
+            indexes: The row indexes to keep
+
+        Returns:
+            A new PayRunResults
+        """
+        columns = [self.employee_ids] + [getattr(self, name) for name in AMOUNT_COLUMNS]
+
+        return PayRunResults(*[[column[index] for index in indexes] for column in columns])
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import os
+import json
+import math
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+from typing import TYPE_CHECKING
+
+import exceptions
+from query_database import Employees, PaySummaryStream
+import pay_calculator
+from pay_calculator import BatchPayCalculator
+from file_handler import tax_tables
+from pay_results import PayRunResults
+
+if TYPE_CHECKING:
+    from pyodbc import Cursor
+
+def fetch_employee_rows(cursor: Cursor, employee_ids: list, file_name: str = 'employee_information', batch_size: int = 500):
+    """
+    Yield the employee query result for each employee ID, fetching `batch_size` employees in each round trip.
+
+    Parameters:
+        cursor: The database cursor returned from the pyodbc server connection
+        employee_ids: An iterable of employee IDs from the pay summary
+        file_name: The name of the .sql file to pass to the Employees class
+        batch_size: The number of employees fetched in each query
+
+    Returns:
+        A generator of Rows with the employee details and tax data for each employee
+    """
+    employee_ids = iter(employee_ids)
+
+    while True:
+        batch_ids = list(islice(employee_ids, batch_size))
+
+        if not batch_ids:
+            return
+
+        employee_data = Employees(cursor, file_name, batch_ids, batch_size)
+
+        yield from employee_data.query_result
+
+def generate_payslips(employee_rows, chunk_size: int = 500):
+    """
+    Yield payslip data values for a stream of employee query results, calculating pay in chunks with the BatchPayCalculator class.
+
+    Only one chunk of employees is held in memory at a time.
+
+    Parameters:
+        employee_rows: An iterable of employee query results
+        chunk_size: The number of employees to calculate in each batch
+
+    Returns:
+        A generator of payslip data values in the same order as the payslip CSV header
+    """
+    chunk = []
+
+    for row in employee_rows:
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            yield from calculate_payslips(chunk)
+            chunk = []
+
+    if chunk:
+        yield from calculate_payslips(chunk)
+
+def collect_results(employee_rows, chunk_size: int = 500):
+    """
+    Calculate pay for a stream of employee query results into a compact PayRunResults store of whole-cent amounts.
+
+    Parameters:
+        employee_rows: An iterable of employee query results
+        chunk_size: The number of employees to calculate in each batch
+
+    Returns:
+        results(PayRunResults): The employee ID, gross pay, tax, superannuation and net pay columns
+    """
+    results = PayRunResults()
+    chunk = []
+
+    for row in employee_rows:
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            results.add_batch([row[0] for row in chunk], calculate_batch(chunk))
+            chunk = []
+
+    if chunk:
+        results.add_batch([row[0] for row in chunk], calculate_batch(chunk))
+
+    return results
+
+def calculate_batch(employee_rows: list):
+    """
+    Pass the pay columns of a list of employee query results to the BatchPayCalculator class.
+
+    Parameters:
+        employee_rows: Employee query results in the `employee_information` column order
+
+    Returns:
+        batch_calculator(BatchPayCalculator): The calculated gross pay, tax, superannuation and net pay columns
+    """
+    hourly_rates = [row[3] for row in employee_rows]
+    countries = [row[4] for row in employee_rows]
+    tfn_present = [row[5] is not None for row in employee_rows]
+    thresholds_claimed = [row[6] for row in employee_rows]
+    hours_worked = [row[7] for row in employee_rows]
+
+    batch_calculator = BatchPayCalculator(hourly_rates, hours_worked, tfn_present, thresholds_claimed, countries)
+    return batch_calculator
+
+def calculate_payslips(employee_rows: list):
+    """
+    Calculate pay for a list of employee query results in a single batch.
+
+    Parameters:
+        employee_rows: Employee query results in the `employee_information` column order
+
+    Returns:
+        A generator of payslip data values in the same order as the payslip CSV header
+    """
+    batch_calculator = calculate_batch(employee_rows)
+
+    for row, results in zip(employee_rows, batch_calculator.results):
+        employee_id, first_name, last_name = row[0], row[1], row[2]
+        date_submitted = row[8]
+
+        yield [employee_id, first_name, last_name, date_submitted, *results]
+
+MAX_SHARD_SIZE = 5000
+
+def split_into_shards(employee_ids: list, shard_size: int):
+    """
+    Sort the employee IDs and split them into contiguous ID ranges.
+
+    Parameters:
+        employee_ids: The employee IDs from the pay summary
+        shard_size: The largest number of employees in each shard
+
+    Returns:
+        shards(list[list[int]]): The employee IDs in each shard, with lower ID ranges first
+    """
+    sorted_ids = sorted(employee_ids)
+    shards = [sorted_ids[start:start + shard_size] for start in range(0, len(sorted_ids), shard_size)]
+
+    return shards
+
+def calculate_shard(connection_factory, shard_ids: list):
+    """
+    Open a connection, then fetch and calculate the payslips for one shard and close the connection again. Runs in a worker process.
+
+    Cedarwood's own exceptions derive from BaseException, which would stop the worker process instead of failing the task, so they are returned for the ShardedPayRun class to raise in the process that started the pay run.
+
+    Parameters:
+        connection_factory: A function that opens a new database connection
+        shard_ids: The employee IDs in the shard
+
+    Returns:
+        payslips(list[list]), error(BaseException): The payslip data values for each employee in the shard, or None and the error if the shard failed
+    """
+    try:
+        connection = connection_factory()
+
+        try:
+            cursor = connection.cursor()
+
+            try:
+                employee_rows = fetch_employee_rows(cursor, shard_ids)
+                payslips = list(generate_payslips(employee_rows))
+
+            finally:
+                cursor.close()
+
+        finally:
+            connection.close()
+
+    except (exceptions.ConnectionError, exceptions.FileNotFoundError, exceptions.TaxTableFormatError) as error:
+        return None, error
+
+    return payslips, None
+
+class ShardedPayRun:
+    def __init__(self, connection_factory, employee_ids: list, worker_count: int = None, shard_size: int = None):
+        self.payslips = self.__run(connection_factory, employee_ids, worker_count, shard_size)
+
+    def __run(self, connection_factory, employee_ids: list, worker_count: int, shard_size: int):
+        """
+        Split the employees into ID-range shards and calculate the shards in parallel worker processes, each with its own database connection.
+
+        Shards are merged back in ID order as they finish, so the payslips can be streamed straight into the PayslipExporter class.
+
+        Parameters:
+            connection_factory: A function that opens a new database connection - it must be picklable, e.g. `functools.partial(connect_sql_server, username, password)`
+            employee_ids: The employee IDs from the pay summary
+            worker_count: The number of worker processes (defaults to the number of CPU cores)
+            shard_size: The largest number of employees in each shard (defaults to an even split across the workers, at most `MAX_SHARD_SIZE`)
+
+        Returns:
+            A generator of payslip data values, ordered by employee ID
+        """
+        employee_ids = list(employee_ids)
+
+        if worker_count is None:
+            worker_count = os.cpu_count() or 1
+
+        if shard_size is None:
+            shard_size = min(max(math.ceil(len(employee_ids) / max(worker_count, 1)), 1), MAX_SHARD_SIZE)
+
+        shards = split_into_shards(employee_ids, shard_size)
+        worker_count = max(min(worker_count, len(shards)), 1)
+
+        pool = Pool(worker_count)
+
+        try:
+            for payslips, error in pool.imap(partial(calculate_shard, connection_factory), shards):
+                if error is not None:
+                    raise error
+
+                yield from payslips
+
+            pool.close()
+
+        except BaseException:
+            pool.terminate()
+            raise
+
+        finally:
+            pool.join()
+
+
+class PayRunSnapshot:
+    def __init__(self, file_path: str, registry = tax_tables):
+        """
+        Keep the payslip values from the last pay run, keyed by employee ID, with the timesheet version each payslip was calculated from.
+
+        The snapshot is saved as a JSON file. Saved payslips are only reused while the super percentage and the tax table files are the same as when they were calculated - otherwise the snapshot starts empty.
+
+        Parameters:
+            file_path: The JSON snapshot file (it doesn't need to exist yet)
+            registry: The TaxTableRegistry the payslips are calculated with
+        """
+        self.file_path = file_path
+        self.fingerprint = str(pay_calculator.SUPER_PERCENTAGE) + '|' + registry.fingerprint()
+        self.entries = self.__read_file()
+
+    def __read_file(self):
+        """
+        Load the saved payslips, if the snapshot file exists and was made with the same super percentage and tax tables.
+
+        Returns:
+            entries(dict[int, tuple]): The `(version, payslip data values)` for each employee ID
+        """
+        try:
+            with open(self.file_path, mode='r', encoding='utf-8') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        if snapshot.get('fingerprint') != self.fingerprint:
+            return {}
+
+        entries = {int(employee_id): (version, payslip) for employee_id, (version, payslip) in snapshot['employees'].items()}
+        return entries
+
+    def get(self, employee_id: int, version: str):
+        """
+        Get the saved payslip for an employee if it was calculated from the same timesheet version.
+
+        Parameters:
+            employee_id: The employee ID
+            version: The current timesheet version, e.g. the `date_submitted` value
+
+        Returns:
+            payslip(list): The saved payslip data values, or None if the employee is new or their timesheet has changed
+        """
+        entry = self.entries.get(employee_id)
+
+        if entry is None or entry[0] != version:
+            return None
+
+        return entry[1]
+
+    def put(self, employee_id: int, version: str, payslip: list):
+        """
+        Save the payslip calculated from a timesheet version.
+
+        Parameters:
+            employee_id: The employee ID
+            version: The timesheet version the payslip was calculated from
+            payslip: The payslip data values
+        """
+        self.entries[employee_id] = (version, payslip)
+
+    def keep_only(self, employee_ids):
+        """
+        Remove every employee that isn't in the current pay run.
+
+        Parameters:
+            employee_ids: The employee IDs to keep
+        """
+        employee_ids = set(employee_ids)
+        self.entries = {employee_id: entry for employee_id, entry in self.entries.items() if employee_id in employee_ids}
+
+    def save(self):
+        """
+        Write the snapshot to its JSON file. The file is replaced in one step, so an interrupted save leaves the last snapshot in place.
+        """
+        snapshot = {'fingerprint': self.fingerprint,
+                    'employees': {str(employee_id): [version, payslip] for employee_id, (version, payslip) in self.entries.items()}}
+
+        temporary_path = self.file_path + '.tmp'
+
+        with open(temporary_path, mode='w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file, default=str)
+
+        os.replace(temporary_path, self.file_path)
+
+class IncrementalPayRun:
+    def __init__(self, cursor: Cursor, snapshot: PayRunSnapshot, versions_file_name: str = 'timesheet_versions', \
+                 file_name: str = 'employee_information', batch_size: int = 500):
+        self.changed_count = 0
+        self.reused_count = 0
+        self.payslips = self.__run(cursor, snapshot, versions_file_name, file_name, batch_size)
+
+    def __run(self, cursor: Cursor, snapshot: PayRunSnapshot, versions_file_name: str, file_name: str, batch_size: int):
+        """
+        Recalculate only the employees whose timesheet has changed since the snapshot was saved, and reuse the saved payslips for everyone else.
+
+        The versions query returns one `(employee_id, version)` row per employee in the pay run, where the version is the `date_submitted` value or a row-version column that changes whenever the timesheet or employee record is edited.
+
+        Parameters:
+            cursor: The database cursor returned from the pyodbc server connection
+            snapshot: The payslips saved by the last pay run - updated and saved once every payslip has been calculated
+            versions_file_name: The name of the .sql file with the versions query
+            file_name: The name of the .sql file to pass to the Employees class
+            batch_size: The number of employees fetched and calculated in each batch
+
+        Returns:
+            payslips(list[list]): The payslip data values for every employee, in versions query order
+        """
+        versions = {}
+
+        for page in PaySummaryStream(cursor, versions_file_name, batch_size).pages:
+            for row in page:
+                versions[int(row[0])] = str(row[1])
+
+        changed_ids = [employee_id for employee_id, version in versions.items() if snapshot.get(employee_id, version) is None]
+
+        for payslip in generate_payslips(fetch_employee_rows(cursor, changed_ids, file_name, batch_size), batch_size):
+            employee_id = int(payslip[0])
+            snapshot.put(employee_id, versions[employee_id], payslip)
+
+        snapshot.keep_only(versions)
+        snapshot.save()
+
+        payslips = [snapshot.get(employee_id, version) for employee_id, version in versions.items()]
+        payslips = [payslip for payslip in payslips if payslip is not None]
+
+        self.changed_count = len(changed_ids)
+        self.reused_count = len(versions) - len(changed_ids)
+
+        return payslips
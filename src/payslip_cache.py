@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import OrderedDict
+
+import pay_calculator
+from query_database import Employees
+from file_handler import tax_tables
+
+def calculate_payslip(query_result):
+    """
+    Pass an employee record to the PayCalculator class.
+
+    Parameters:
+        query_result: The employee details and tax data from the employee query
+
+    Returns:
+        query_result(Row), results(tuple[str, str, str, str]): The employee record and the rounded calculation results
+    """
+    employee_id, first_name, last_name, hourly_rate, country, \
+    tfn, threshold_claimed, hours_worked, date_submitted = query_result
+
+    calculator = pay_calculator.PayCalculator(hourly_rate, hours_worked, tfn, threshold_claimed, country)
+
+    return query_result, calculator.results
+
+class PayslipCache:
+    def __init__(self, max_size: int = 64, registry = tax_tables, check_interval: float = 1.0):
+        """
+        Keep the most recently prefetched payslips, keyed by employee ID, so the Payslip view can be shown without a query or calculation.
+
+        The cache is emptied whenever a tax table file changes on disk or `SUPER_PERCENTAGE` changes, the same as the PayCalculationCache class.
+
+        Parameters:
+            max_size: The largest number of payslips kept - the least recently used payslip is dropped first
+            registry: The TaxTableRegistry whose tables the cached payslips were calculated from
+            check_interval: The fewest seconds between checks of the tax table files
+        """
+        self.max_size = max_size
+        self.registry = registry
+        self.check_interval = check_interval
+
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.version = (registry.version, pay_calculator.SUPER_PERCENTAGE)
+        self.last_check = time.monotonic()
+
+    def __contains__(self, employee_id: int):
+        self.validate()
+
+        with self.lock:
+            return employee_id in self.entries
+
+    def validate(self):
+        """
+        Empty the cache if `SUPER_PERCENTAGE` has changed, or a tax table file has changed since the last check.
+
+        Returns:
+            version(tuple): The `(registry version, super percentage)` the cached payslips were calculated with
+        """
+        now = time.monotonic()
+
+        if now - self.last_check >= self.check_interval:
+            self.last_check = now
+            self.registry.check_for_changes()
+
+        version = (self.registry.version, pay_calculator.SUPER_PERCENTAGE)
+
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+            return self.version
+
+    def get(self, employee_id: int):
+        """
+        Get a prefetched payslip, counting a hit or a miss.
+
+        Parameters:
+            employee_id: The employee ID
+
+        Returns:
+            The `(employee record, rounded results)` payslip, or None if it hasn't been prefetched
+        """
+        self.validate()
+
+        with self.lock:
+            payslip = self.entries.get(employee_id)
+
+            if payslip is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(employee_id)
+
+            return payslip
+
+    def put(self, employee_id: int, payslip: tuple, version: tuple = None):
+        """
+        Store a payslip, dropping the least recently used payslip if the cache is full.
+
+        Parameters:
+            employee_id: The employee ID
+            payslip: The `(employee record, rounded results)` payslip
+            version: The `version` returned by `validate` before the payslip was calculated - the payslip is dropped if the cache has been emptied since (optional)
+        """
+        with self.lock:
+            if version is not None and version != self.version:
+                return
+
+            self.entries[employee_id] = payslip
+            self.entries.move_to_end(employee_id)
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def prefetch(self, employee_ids: list, open_cursor, employee_records: dict = None, file_name: str = 'employee_information', \
+                 batch_size: int = 8):
+        """
+        Calculate and store the payslips of every employee that isn't already cached. Runs on a worker thread.
+
+        Records already fetched with the pay summary are used as they are - only the rest are fetched, in one batched Employees query.
+
+        Parameters:
+            employee_ids: The employee IDs to prefetch, most important first
+            open_cursor: A function returning a cursor context manager, e.g. `ConnectionPool.cursor`
+            employee_records: The employee records already fetched, keyed by employee ID (optional)
+            file_name: The name of the .sql file to pass to the Employees class
+            batch_size: The number of employee IDs in the Employees query - keep this the same between calls so the query text is reused
+
+        Returns:
+            prefetched_count(int): The number of payslips calculated
+        """
+        version = self.validate()
+
+        with self.lock:
+            employee_ids = [employee_id for employee_id in employee_ids if employee_id not in self.entries]
+
+        if employee_records is None:
+            employee_records = {}
+
+        records = {employee_id: employee_records[employee_id] for employee_id in employee_ids if employee_id in employee_records}
+        missing_ids = [employee_id for employee_id in employee_ids if employee_id not in records]
+
+        if missing_ids:
+            with open_cursor() as cursor:
+                for start in range(0, len(missing_ids), batch_size):
+                    employee_data = Employees(cursor, file_name, missing_ids[start:start + batch_size], batch_size)
+                    records.update((employee_record[0], employee_record) for employee_record in employee_data.query_result)
+
+        prefetched_count = 0
+
+        for employee_id in employee_ids:
+            if employee_id in records:
+                self.put(employee_id, calculate_payslip(records[employee_id]), version)
+                prefetched_count += 1
+
+        return prefetched_count
+
+    def clear(self):
+        """
+        Remove every prefetched payslip and reset the hit and miss counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
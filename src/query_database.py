@@ -1,6 +1,14 @@
-from pyodbc import Cursor
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
 from file_handler import QueryReader
-from format_handler import PlaceholderHandler
+from instrumentation import timings
+from format_handler import PlaceholderHandler, PlaceholderListHandler
+
+if TYPE_CHECKING:
+    from pyodbc import Cursor
 
 class PaySummary:
     def __init__(self, cursor: Cursor, file_name: str):
@@ -19,51 +27,365 @@ class PaySummary:
         """
         file_path = QueryReader(file_name)
         query = file_path.query
-        cursor.execute(query)
+        with timings.time('execute'):
+            cursor.execute(query)
 
-        output = cursor.fetchall()
-        result = []
+        with timings.time('fetchall'):
+            result = cursor.fetchall()
 
-        for row in output:
-            result.append(row)
-        
         return result
 
+class PaySummaryStream:
+    def __init__(self, cursor: Cursor, file_name: str, page_size: int = 500, parameters: list = None):
+        self.pages = self.__execute_query(cursor, file_name, page_size, parameters)
+
+    def __execute_query(self, cursor: Cursor, file_name: str, page_size: int, parameters: list):
+        """
+        Execute the pay summary query and return a generator that fetches the results one page at a time.
+
+        Parameters:
+            cursor: The database cursor returned from the pyodbc server connection (it must not be reused until the pages are exhausted)
+            file_name: The name of the .sql file to pass to the QueryReader class
+            page_size: The number of rows fetched in each page
+            parameters: The values for any `?` parameter markers in the query, e.g. a start and end date (optional)
+
+        Returns:
+            pages(generator[list]): Lists of up to `page_size` rows of pay summary data
+        """
+        file_path = QueryReader(file_name)
+        query = file_path.query
+        with timings.time('execute'):
+            if parameters:
+                cursor.execute(query, parameters)
+            else:
+                cursor.execute(query)
+
+        return self.__fetch_pages(cursor, page_size)
+
+    def __fetch_pages(self, cursor: Cursor, page_size: int):
+        """
+        Yield pages of results with `fetchmany` until the query has no rows left.
+
+        Parameters:
+            cursor: The database cursor the query was executed on
+            page_size: The number of rows fetched in each page
+
+        Returns:
+            A generator of lists of up to `page_size` rows
+        """
+        while True:
+            with timings.time('fetchmany'):
+                page = cursor.fetchmany(page_size)
+
+            if not page:
+                return
+
+            yield page
+
+class PaySummaryWindow:
+    def __init__(self, open_pages, window_size: int = 1000):
+        """
+        Hold a bounded window of pay summary rows from a paged query, moving forwards or backwards a page at a time.
+
+        Only `window_size` rows are kept - loading past the end drops rows from the start. Because query cursors only move forwards, moving back before the start of the window runs the query again and skips to the earlier rows.
+
+        Page fetches and `close` hold a lock for as long as the query runs, so they belong on a worker thread - the main thread calls `cancel`, which never waits.
+
+        Parameters:
+            open_pages: A function that runs the pay summary query and returns a new generator of pages
+            window_size: The largest number of rows held at once
+        """
+        self.open_pages = open_pages
+        self.window_size = window_size
+
+        self.rows = []
+        self.first_row = 0
+        self.finished = False
+        self.pages = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def next_page(self):
+        """
+        Fetch the page after the current window. Safe to call from a worker thread.
+
+        Returns:
+            page(list): The fetched rows (empty once the query has no rows left, or if the fetch was cancelled)
+        """
+        with self.lock:
+            if self.cancelled:
+                return self.__stop_cancelled_fetch()
+
+            if self.finished:
+                return []
+
+            page = []
+
+            if self.pages is None:
+                self.pages = self.open_pages()
+                page = self.__skip_rows(self.first_row + len(self.rows))
+
+            if not page and not self.cancelled:
+                page = next(self.pages, [])
+
+            if self.cancelled:
+                return self.__stop_cancelled_fetch()
+
+            if not page:
+                self.finished = True
+                self.__close_pages()
+
+            return page
+
+    def previous_page(self, page_size: int):
+        """
+        Fetch up to `page_size` rows before the current window by running the query again. Safe to call from a worker thread.
+
+        Parameters:
+            page_size: The number of rows to fetch
+
+        Returns:
+            page(list): The fetched rows (empty if the window already starts at the first row, or if the fetch was cancelled)
+        """
+        with self.lock:
+            if self.cancelled:
+                return self.__stop_cancelled_fetch()
+
+            start_row = max(self.first_row - page_size, 0)
+            row_count = self.first_row - start_row
+
+            if row_count == 0:
+                return []
+
+            self.__close_pages()
+            self.pages = self.open_pages()
+            page = self.__skip_rows(start_row)
+
+            while len(page) < row_count and not self.cancelled:
+                rows = next(self.pages, [])
+
+                if not rows:
+                    break
+
+                page.extend(rows)
+
+            if self.cancelled:
+                return self.__stop_cancelled_fetch()
+
+            self.__close_pages()
+            return page[:row_count]
+
+    def append(self, page: list):
+        """
+        Add a page after the current window, dropping rows from the start if the window is full.
+
+        Parameters:
+            page: The rows from `next_page`
+
+        Returns:
+            removed_count(int): The number of rows dropped from the start of the window
+        """
+        self.rows.extend(page)
+        removed_count = max(len(self.rows) - self.window_size, 0)
+
+        if removed_count:
+            del self.rows[:removed_count]
+            self.first_row += removed_count
+
+        return removed_count
+
+    def prepend(self, page: list):
+        """
+        Add a page before the current window, dropping rows from the end if the window is full.
+
+        Parameters:
+            page: The rows from `previous_page`
+
+        Returns:
+            removed_count(int): The number of rows dropped from the end of the window
+        """
+        self.rows[:0] = page
+        self.first_row -= len(page)
+        removed_count = max(len(self.rows) - self.window_size, 0)
+
+        if removed_count:
+            del self.rows[-removed_count:]
+            self.finished = False
+            self.__close_pages()
+
+        return removed_count
+
+    def cancel(self):
+        """
+        Make any page fetch that is still running, or waiting to run, stop at the next page boundary and close the query without adding to the window. Safe to call from the main thread - it doesn't wait for the fetch.
+
+        The request stays in place until a fetch or `close` acts on it, so a fetch that was waiting for the lock when the view was paused is cancelled too.
+        """
+        self.cancelled = True
+
+    def close(self):
+        """
+        Stop the query so its connection goes back to the pool, waiting for any page fetch that is still running. Call `cancel` first and run this on a worker thread.
+        """
+        with self.lock:
+            self.__close_pages()
+            self.cancelled = False
+
+    def __stop_cancelled_fetch(self):
+        """
+        Close the page generator after a cancelled fetch, so the next fetch runs the query again from the end of the window instead of continuing past rows that were never added to it.
+
+        Returns:
+            page(list): An empty page
+        """
+        self.__close_pages()
+        self.cancelled = False
+        return []
+
+    def __skip_rows(self, row_count: int):
+        """
+        Move the page generator forward past `row_count` rows that are already held or were dropped.
+
+        Parameters:
+            row_count: The number of rows to skip
+
+        Returns:
+            remaining_rows(list): The rows after the skipped rows from the last page read (empty if the skip ended on a page boundary)
+        """
+        skipped_count = 0
+
+        while skipped_count < row_count and not self.cancelled:
+            page = next(self.pages, [])
+
+            if not page:
+                break
+
+            if skipped_count + len(page) > row_count:
+                remaining_rows = page[row_count - skipped_count:]
+                return remaining_rows
+
+            skipped_count += len(page)
+
+        return []
+
+    def __close_pages(self):
+        """
+        Close the page generator, if there is one.
+        """
+        if self.pages is not None:
+            self.pages.close()
+            self.pages = None
+
+parameterized_queries = {}
+
 class Employee:
     def __init__(self, cursor: Cursor, file_name: str, id: int):
-        self.updated_query = self.__format_query(file_name, id)
-        self.query_result = self.__execute_query(cursor)
+        self.updated_query = self.__format_query(file_name)
+        self.query_result = self.__execute_query(cursor, id)
 
-    def __format_query(self, file_name: str, id: int):
+    def __format_query(self, file_name: str):
         """
-        Replace the placeholder ID in the query with the ID selected by the user.
+        Replace the placeholder ID in the query with a `?` parameter marker.
+
+        The parameterized query is cached per file name, so every employee sends the same SQL text and the server can reuse its plan.
 
         Parameters:
             file_name: The name of the .sql file to pass to the QueryReader class
-            id: The employee ID selected from the pay summary list
         
         Returns:
-            updated_query(string): The new SQL query string with the updated employee ID
+            updated_query(string): The SQL query string with a parameter marker for the employee ID
         """
-        file_path = QueryReader(file_name)
-        query_string = file_path.query
+        updated_query = parameterized_queries.get(file_name)
+
+        if updated_query is None:
+            file_path = QueryReader(file_name)
+            query_string = file_path.query
+
+            query = PlaceholderHandler(query_string, '?')
+            updated_query = query.updated_string
+            parameterized_queries[file_name] = updated_query
 
-        query = PlaceholderHandler(query_string, id)
-        updated_query = query.updated_string
         return updated_query
 
-    def __execute_query(self, cursor: Cursor):
+    def __execute_query(self, cursor: Cursor, id: int):
         """
         Get a single result from an executed query.
 
         Parameters:
             cursor: The database cursor returned from the pyodbc server connection
+            id: The employee ID selected from the pay summary list
         
         Returns:
             result(Row): Employee details and tax data for an individual employee
         """
         query = self.updated_query
-        cursor.execute(query)
+        with timings.time('execute'):
+            cursor.execute(query, [int(id)])
+
+        with timings.time('fetchone'):
+            result = cursor.fetchone()
+
+        return result
+
+class Employees:
+    def __init__(self, cursor: Cursor, file_name: str, ids: list, batch_size: int = 500):
+        self.query_result = self.__execute_query(cursor, file_name, ids, batch_size)
+
+    def __format_query(self, file_name: str, batch_size: int):
+        """
+        Replace the placeholder ID comparison in the query with an `IN` list of `batch_size` parameter markers.
+
+        Parameters:
+            file_name: The name of the .sql file to pass to the QueryReader class
+            batch_size: The number of employee IDs fetched in each query
+
+        Returns:
+            updated_query(string): The SQL query string with parameter markers for a batch of employee IDs
+        """
+        cache_key = (file_name, batch_size)
+        updated_query = parameterized_queries.get(cache_key)
+
+        if updated_query is None:
+            file_path = QueryReader(file_name)
+            query_string = file_path.query
+
+            query = PlaceholderListHandler(query_string, batch_size)
+            updated_query = query.updated_string
+            parameterized_queries[cache_key] = updated_query
+
+        return updated_query
+
+    def __execute_query(self, cursor: Cursor, file_name: str, ids: list, batch_size: int):
+        """
+        Get the results for many employees, fetching up to `batch_size` employees in each round trip.
+
+        Every batch uses the same SQL text - a short final batch is padded by repeating its last ID.
+
+        Parameters:
+            cursor: The database cursor returned from the pyodbc server connection
+            file_name: The name of the .sql file to pass to the QueryReader class
+            ids: The employee IDs to fetch
+            batch_size: The number of employee IDs fetched in each query
+
+        Returns:
+            result(list[Row]): Employee details and tax data in the same order as `ids` (IDs with no record are left out)
+        """
+        ids = [int(id) for id in ids]
+        query = self.__format_query(file_name, batch_size)
+        rows_by_id = {}
+
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            parameters = batch_ids + [batch_ids[-1]] * (batch_size - len(batch_ids))
+
+            with timings.time('execute'):
+                cursor.execute(query, parameters)
+
+            with timings.time('fetchall'):
+                rows = cursor.fetchall()
+
+            for row in rows:
+                rows_by_id[row[0]] = row
 
-        result = cursor.fetchone()
+        result = [rows_by_id[id] for id in ids if id in rows_by_id]
         return result
@@ -0,0 +1,168 @@
+import csv
+from collections import Counter
+from itertools import product
+
+import pay_calculator
+from pay_calculator import BatchPayCalculator
+from file_handler import TaxTableRegistry, tax_tables, PAYSLIP_HEADER
+from format_handler import to_cents, format_cents
+
+class Scenario:
+    def __init__(self, name: str, tax_table_directory: str = None, super_percentage: float = None, \
+                 rate_multiplier: float = 1.0):
+        """
+        Describe one what-if pay run - a set of tax tables, a super percentage and a change to every hourly rate.
+
+        Parameters:
+            name: The scenario name used in reports
+            tax_table_directory: A directory of alternative tax table CSVs with the same file names as `res/` (defaults to the current tables)
+            super_percentage: The super guarantee percentage (defaults to the current `SUPER_PERCENTAGE`)
+            rate_multiplier: The factor every hourly rate is multiplied by, e.g. `1.035` for a 3.5% award increase
+        """
+        self.name = name
+        self.tax_table_directory = tax_table_directory
+        self.super_percentage = pay_calculator.SUPER_PERCENTAGE if super_percentage is None else super_percentage
+        self.rate_multiplier = rate_multiplier
+
+    def __repr__(self):
+        return 'Scenario(' + repr(self.name) + ')'
+
+def build_scenario_grid(tax_table_directories = (None,), super_percentages = None, rate_multipliers = (1.0,)):
+    """
+    Get a scenario for every combination of tax tables, super percentage and rate multiplier.
+
+    Parameters:
+        tax_table_directories: The tax table directories to try (None for the current tables)
+        super_percentages: The super percentages to try (defaults to the current `SUPER_PERCENTAGE`)
+        rate_multipliers: The hourly rate multipliers to try
+
+    Returns:
+        scenarios(list[Scenario]): The scenarios, named after their settings, e.g. `current tables, super 11.5%, rates x1.035`
+    """
+    scenarios = []
+
+    if super_percentages is None:
+        super_percentages = (pay_calculator.SUPER_PERCENTAGE,)
+
+    for tax_table_directory, super_percentage, rate_multiplier in product(tax_table_directories, super_percentages, rate_multipliers):
+        name = ('current tables' if tax_table_directory is None else tax_table_directory) + \
+               ', super ' + format(super_percentage, 'g') + '%' + \
+               ', rates x' + format(rate_multiplier, 'g')
+
+        scenarios.append(Scenario(name, tax_table_directory, super_percentage, rate_multiplier))
+
+    return scenarios
+
+class ScenarioResult:
+    def __init__(self, scenario: Scenario, totals: tuple, baseline_totals: tuple):
+        """
+        Hold the workforce totals of one scenario and how far they are from the baseline.
+
+        Parameters:
+            scenario: The scenario
+            totals: The gross pay, tax amount, superannuation and net pay totals in cents
+            baseline_totals: The same totals for the baseline scenario
+        """
+        self.scenario = scenario
+        self.totals = totals
+        self.deltas = tuple(total - baseline_total for total, baseline_total in zip(totals, baseline_totals))
+
+    def to_row(self):
+        """
+        Get the scenario name, totals and deltas formatted for a report.
+
+        Returns:
+            row(list[str]): The name, the four totals and the four deltas in AUD
+        """
+        return [self.scenario.name] + [format_cents(total) for total in self.totals] + \
+               [format_cents(delta) for delta in self.deltas]
+
+class ScenarioSweep:
+    def __init__(self, employee_rows, scenarios: list, baseline: Scenario = None):
+        self.employee_count = 0
+        self.results = self.__run(employee_rows, scenarios, baseline)
+
+    def __run(self, employee_rows, scenarios: list, baseline: Scenario):
+        """
+        Calculate every scenario across the whole workforce and compare each one to the baseline.
+
+        Employees with the same hourly rate, hours, TFN, threshold and residence always get the same pay, so each distinct set of inputs is calculated once per scenario with the BatchPayCalculator class and weighted by how many employees share it. Scenario results skip the shared PayCalculationCache so they never push out real pay run results. Totals are sums of the rounded payslip amounts, so they match an exported pay run to the cent.
+
+        Parameters:
+            employee_rows: An iterable of employee query results in the `employee_information` column order
+            scenarios: The scenarios to evaluate
+            baseline: The scenario the deltas are measured from (defaults to the current tables, super percentage and rates)
+
+        Returns:
+            results(list[ScenarioResult]): The totals and deltas for each scenario, in the same order as `scenarios`
+        """
+        input_counts = Counter((row[3], row[7], row[5] is not None, row[6], row[4]) for row in employee_rows)
+        self.employee_count = sum(input_counts.values())
+
+        inputs = list(input_counts)
+        counts = [input_counts[key] for key in inputs]
+        registries = {}
+
+        if baseline is None:
+            baseline = Scenario('baseline')
+
+        baseline_totals = self.__calculate_totals(baseline, inputs, counts, registries)
+        results = [ScenarioResult(scenario, self.__calculate_totals(scenario, inputs, counts, registries), baseline_totals) \
+                   for scenario in scenarios]
+
+        return results
+
+    def __calculate_totals(self, scenario: Scenario, inputs: list, counts: list, registries: dict):
+        """
+        Calculate the weighted workforce totals for one scenario.
+
+        Parameters:
+            scenario: The scenario
+            inputs: The distinct `(hourly rate, hours worked, tfn present, threshold claimed, residence)` inputs
+            counts: The number of employees sharing each input
+            registries: A TaxTableRegistry for each alternative tax table directory, reused across scenarios
+
+        Returns:
+            totals(tuple[int]): The gross pay, tax amount, superannuation and net pay totals in cents
+        """
+        if not inputs:
+            return (0, 0, 0, 0)
+
+        registry = tax_tables
+
+        if scenario.tax_table_directory is not None:
+            registry = registries.get(scenario.tax_table_directory)
+
+            if registry is None:
+                registry = TaxTableRegistry(scenario.tax_table_directory)
+                registries[scenario.tax_table_directory] = registry
+
+        hourly_rates, hours_worked, tfn_present, thresholds_claimed, residences = (list(column) for column in zip(*inputs))
+
+        if scenario.rate_multiplier != 1.0:
+            hourly_rates = [hourly_rate * scenario.rate_multiplier for hourly_rate in hourly_rates]
+
+        batch_calculator = BatchPayCalculator(hourly_rates, hours_worked, tfn_present, thresholds_claimed, residences, \
+                                              scenario.super_percentage, registry, cache=None)
+
+        columns = (batch_calculator.gross_pay, batch_calculator.tax_amount, batch_calculator.super_amount, batch_calculator.net_pay)
+        totals = tuple(sum(to_cents(amount) * count for amount, count in zip(column, counts)) for column in columns)
+
+        return totals
+
+    def write_report(self, file_path: str):
+        """
+        Write the totals and deltas of every scenario to a CSV file.
+
+        Parameters:
+            file_path: The report file to write
+        """
+        amount_names = PAYSLIP_HEADER[4:]
+        header = ['Scenario'] + ['Total ' + name for name in amount_names] + ['Change in ' + name for name in amount_names]
+
+        with open(file_path, mode='w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(header)
+
+            for result in self.results:
+                csv_writer.writerow(result.to_row())
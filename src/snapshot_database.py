@@ -0,0 +1,257 @@
+import time
+import sqlite3
+import threading
+from decimal import Decimal
+from datetime import date, datetime
+from functools import partial
+
+import exceptions
+from connect_database import DatabaseBackend, ConnectionPool
+from file_handler import query_cache
+from query_database import PaySummaryStream, Employees
+
+SNAPSHOT_SCHEMA = ['''CREATE TABLE IF NOT EXISTS pay_summary (
+    position INTEGER PRIMARY KEY, employee_id INTEGER, first_name TEXT, last_name TEXT, hours_worked REAL)''',
+                   '''CREATE TABLE IF NOT EXISTS employee_information (
+    employee_id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, hourly_rate REAL, country TEXT,
+    tfn, threshold_claimed BOOLEAN, hours_worked REAL, date_submitted TEXT)''',
+                   '''CREATE TABLE IF NOT EXISTS snapshot_info (id INTEGER PRIMARY KEY CHECK (id = 1), refreshed_at REAL)''']
+
+SNAPSHOT_PAY_SUMMARY_SQL = '''SELECT employee_id, first_name, last_name, hours_worked
+FROM pay_summary
+ORDER BY position'''
+
+SNAPSHOT_EMPLOYEE_INFORMATION_SQL = '''SELECT employee_id, first_name, last_name, hourly_rate, country,
+       tfn, threshold_claimed, hours_worked, date_submitted
+FROM employee_information
+WHERE employee_id = 0000'''
+
+SNAPSHOT_TABLES = ['pay_summary', 'employee_information', 'snapshot_info']
+
+# Bumped whenever SNAPSHOT_SCHEMA changes, so snapshots saved by an older version are rebuilt instead of read with the old column types
+SNAPSHOT_SCHEMA_VERSION = 2
+
+# The server queries a snapshot can serve, and the query_cache name of the SQLite version of each one
+SNAPSHOT_QUERIES = {'pay_summary': ('snapshot_pay_summary', SNAPSHOT_PAY_SUMMARY_SQL),
+                    'employee_information': ('snapshot_employee_information', SNAPSHOT_EMPLOYEE_INFORMATION_SQL)}
+
+# Amounts are saved as REAL, which is what the pay calculator works in, and dates are saved as ISO text, which is how payslips show them
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, partial(datetime.isoformat, sep=' '))
+
+# SQLite stores the server's BIT values as 1 and 0 - read them back as bool, which is what get_table_name expects
+sqlite3.register_converter('BOOLEAN', lambda value: bool(int(value)))
+
+def connect_snapshot(snapshot_path: str):
+    """
+    Open the snapshot database, creating its tables if they don't exist yet, or rebuilding them empty if they were saved with an older schema.
+
+    The database uses write-ahead logging, so the views keep reading the last snapshot while a refresh is written. Connections can be used from any thread - the ConnectionPool only hands each one to one thread at a time.
+
+    Parameters:
+        snapshot_path: The SQLite file of the snapshot
+
+    Returns:
+        connection(Connection): An open sqlite3 connection
+    """
+    connection = sqlite3.connect(snapshot_path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('BEGIN IMMEDIATE')
+
+    if connection.execute('PRAGMA user_version').fetchone()[0] != SNAPSHOT_SCHEMA_VERSION:
+        for table in SNAPSHOT_TABLES:
+            connection.execute('DROP TABLE IF EXISTS ' + table)
+
+        connection.execute('PRAGMA user_version = ' + str(SNAPSHOT_SCHEMA_VERSION))
+
+    for statement in SNAPSHOT_SCHEMA:
+        connection.execute(statement)
+
+    connection.commit()
+    return connection
+
+class SnapshotBackend(DatabaseBackend):
+    def __init__(self, snapshot_path: str, source: ConnectionPool = None, max_age: float = 900, page_size: int = 500, \
+                 size: int = 4):
+        """
+        Serve the pay summary and employee queries from a local SQLite snapshot of the server, refreshing it from the server when it is older than `max_age`.
+
+        Every other query, every write and every refresh goes to the server, so a review session only puts load on the server once per refresh. Without a server the last snapshot is read as it is, for offline use or as a stand-in for load testing.
+
+        Parameters:
+            snapshot_path: The SQLite file of the snapshot - it is kept between sessions
+            source: The server ConnectionPool used for refreshes, writes and other queries (optional)
+            max_age: How many seconds a snapshot is read before the next read refreshes it
+            page_size: The number of pay summary rows and employee records copied in each round trip during a refresh
+            size: The largest number of snapshot connections open at once
+
+        Exceptions:
+            exceptions.ConnectionError: There is no server and the snapshot has never been refreshed
+        """
+        self.source = source
+        self.max_age = max_age
+        self.page_size = page_size
+        self.refresh_lock = threading.Lock()
+
+        for query_name, query in SNAPSHOT_QUERIES.values():
+            query_cache.setdefault(query_name, query)
+
+        self.snapshot = ConnectionPool(partial(connect_snapshot, snapshot_path), size)
+        self.refreshed_time = self.__read_refreshed_time()
+
+        if source is None and self.refreshed_time is None:
+            self.snapshot.close()
+            raise exceptions.ConnectionError('The snapshot is empty and there is no server connection to refresh it')
+
+    def cursor(self, file_name: str = None):
+        """
+        Check out a snapshot cursor for the pay summary and employee queries, refreshing the snapshot first if it is stale, or a server cursor for any other query.
+
+        Parameters:
+            file_name: The name of the query the cursor will run, e.g. `pay_summary`
+
+        Returns:
+            A cursor context manager
+
+        Exceptions:
+            exceptions.ConnectionError: The snapshot has never been refreshed and there is no server to refresh it from
+        """
+        if file_name not in SNAPSHOT_QUERIES:
+            return self.connection_to_source().cursor(file_name)
+
+        self.refresh_if_stale()
+        return self.snapshot.cursor(file_name)
+
+    def connection(self):
+        """
+        Check out a server connection for writes.
+
+        Returns:
+            A connection context manager
+        """
+        return self.connection_to_source().connection()
+
+    def query_name(self, file_name: str):
+        """
+        Get the SQLite version of a query the snapshot serves, or the server query for any other query.
+
+        Parameters:
+            file_name: The name of the server query
+
+        Returns:
+            file_name(str): The name of the query to pass to the QueryReader class
+        """
+        if file_name in SNAPSHOT_QUERIES:
+            return SNAPSHOT_QUERIES[file_name][0]
+
+        return file_name
+
+    def connection_to_source(self):
+        """
+        Get the server ConnectionPool.
+
+        Returns:
+            source(ConnectionPool): The server connection pool
+
+        Exceptions:
+            exceptions.ConnectionError: The backend was opened without a server
+        """
+        if self.source is None:
+            raise exceptions.ConnectionError('The snapshot is offline - there is no server connection for this query')
+
+        return self.source
+
+    def age(self):
+        """
+        Get how long ago the snapshot was refreshed.
+
+        Returns:
+            age(float): The number of seconds since the last refresh, or infinity if it has never been refreshed
+        """
+        if self.refreshed_time is None:
+            return float('inf')
+
+        return time.time() - self.refreshed_time
+
+    def mark_stale(self):
+        """
+        Make the next read refresh the snapshot from the server, if there is one.
+        """
+        if self.source is not None:
+            self.refreshed_time = None
+
+    def refresh_if_stale(self):
+        """
+        Refresh the snapshot if it is older than `max_age` and there is a server to refresh it from. Only one thread refreshes at a time - the others wait and then read the new snapshot.
+
+        Exceptions:
+            exceptions.ConnectionError: The snapshot has never been refreshed and there is no server to refresh it from
+        """
+        if self.age() <= self.max_age:
+            return
+
+        if self.source is None:
+            if self.refreshed_time is None:
+                raise exceptions.ConnectionError('The snapshot is empty and there is no server connection to refresh it')
+            return
+
+        with self.refresh_lock:
+            if self.age() > self.max_age:
+                self.refresh()
+
+    def refresh(self):
+        """
+        Copy the pay summary and the employee record of every employee in it from the server into the snapshot in one transaction.
+
+        The pay summary is read a page at a time and each page's employee records are fetched with one batched Employees query, so the server runs the same queries the views would have run, once. Readers see the old snapshot until the new one is committed.
+
+        Returns:
+            row_count(int): The number of pay summary rows copied
+        """
+        source = self.connection_to_source()
+        row_count = 0
+
+        with self.snapshot.connection() as snapshot_connection:
+            snapshot_connection.execute('DELETE FROM pay_summary')
+            snapshot_connection.execute('DELETE FROM employee_information')
+
+            with source.cursor('pay_summary') as summary_cursor, source.cursor('employee_information') as employee_cursor:
+                pay_summary = PaySummaryStream(summary_cursor, 'pay_summary', self.page_size)
+
+                for page in pay_summary.pages:
+                    snapshot_connection.executemany('INSERT INTO pay_summary VALUES (?, ?, ?, ?, ?)', \
+                                                    [[row_count + index] + list(row) for index, row in enumerate(page)])
+                    row_count += len(page)
+
+                    employee_data = Employees(employee_cursor, 'employee_information', [row[0] for row in page], self.page_size)
+                    snapshot_connection.executemany('INSERT OR REPLACE INTO employee_information VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', \
+                                                    [list(employee_record) for employee_record in employee_data.query_result])
+
+            refreshed_time = time.time()
+            snapshot_connection.execute('INSERT OR REPLACE INTO snapshot_info VALUES (1, ?)', [refreshed_time])
+
+        self.refreshed_time = refreshed_time
+        return row_count
+
+    def close(self):
+        """
+        Close the snapshot connections and the server connection pool.
+        """
+        self.snapshot.close()
+
+        if self.source is not None:
+            self.source.close()
+
+    def __read_refreshed_time(self):
+        """
+        Get the time the snapshot was last refreshed, which is kept in the snapshot file between sessions.
+
+        Returns:
+            refreshed_time(float): The refresh time in seconds since the epoch, or None if the snapshot has never been refreshed
+        """
+        with self.snapshot.cursor() as cursor:
+            cursor.execute('SELECT refreshed_at FROM snapshot_info WHERE id = 1')
+            row = cursor.fetchone()
+
+        return row[0] if row else None
@@ -1,5 +1,27 @@
 from file_handler import CsvReader
 
+RESIDENT_NO_TFN_RATE = 0.4700
+FOREIGN_NO_TFN_RATE = 0.4500
+
+def get_table_name(threshold_claimed: bool, residence: str):
+    """
+    Get the name of the tax table CSV that applies to an employee with a tfn record.
+
+    Parameters:
+        threshold_claimed: A record of if an employee has claimed the tax-free threshold (may be null)
+        residence: The country of residence for an employee
+
+    Returns:
+        file_name(str): `foreign_resident` for foreign residents, otherwise `threshold_true` or `threshold_false`
+    """
+    if residence != 'Australia':
+        file_name = 'foreign_resident'
+    else:
+        tax_threshold = str(threshold_claimed).lower()
+        file_name = 'threshold_' + tax_threshold
+
+    return file_name
+
 class TaxCalculator:
     def __init__(self, gross_pay: int, tfn: int, threshold_claimed: bool, residence: str):
         self.tax_rate = self.__get_rate(gross_pay, tfn, threshold_claimed, residence)
@@ -20,19 +42,13 @@ class TaxCalculator:
         """
         if tfn is None:
             if residence != 'Australia':
-                tax_rate = 0.4500
+                tax_rate = FOREIGN_NO_TFN_RATE
                 return tax_rate
             else:
-                tax_rate = 0.4700
+                tax_rate = RESIDENT_NO_TFN_RATE
                 return tax_rate
         else:
-            file_name = ''
-
-            if residence != 'Australia':
-                file_name = 'foreign_resident'
-            else:
-                tax_threshold = str(threshold_claimed).lower()
-                file_name = 'threshold_' + tax_threshold
+            file_name = get_table_name(threshold_claimed, residence)
 
             csv_reader = CsvReader(file_name, gross_pay)
             coefficients = csv_reader.row_result
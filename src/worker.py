@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import profile_action
+
+class BackgroundTask:
+    def __init__(self, future):
+        self.future = future
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Stop the task if it hasn't started yet, and make sure none of its callbacks run.
+        """
+        self.cancelled = True
+        self.future.cancel()
+
+class BackgroundWorker:
+    def __init__(self, widget, max_workers: int = 4, poll_interval: int = 50):
+        """
+        Run database queries and pay calculations on worker threads so the Tkinter event loop never waits on them.
+
+        Results are posted back with `after()` callbacks, which always run on the Tkinter main thread.
+
+        Parameters:
+            widget: The widget used to schedule `after()` callbacks - this should be the root window so callbacks outlive individual views
+            max_workers: The number of worker threads
+            poll_interval: How many milliseconds to wait between checks on a running task
+        """
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cedarwood-worker')
+
+    def submit(self, function, on_success, on_error = None, on_poll = None):
+        """
+        Run a function on a worker thread and pass its result to a callback on the main thread.
+
+        Parameters:
+            function: The function to run, which must not touch any Tkinter widgets
+            on_success: Called with the function's return value
+            on_error: Called with the exception if the function raises
+            on_poll: Called on every check while the function is still running, e.g. to show progress
+
+        Returns:
+            task(BackgroundTask): A handle that can cancel the callbacks
+        """
+        future = self.executor.submit(self.__run, function)
+        task = BackgroundTask(future)
+
+        self.widget.after(self.poll_interval, self.__poll, task, on_success, on_error, on_poll)
+        return task
+
+    def shutdown(self):
+        """
+        Stop accepting tasks and cancel any that haven't started.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __run(self, function):
+        """
+        Run a submitted function on a worker thread, capturing a cProfile of it if profiling is turned on.
+
+        Parameters:
+            function: The submitted function
+
+        Returns:
+            The function's return value
+        """
+        target = getattr(function, 'func', function)
+        action_name = getattr(target, '__name__', 'task').lstrip('_')
+
+        with profile_action(action_name):
+            return function()
+
+    def __poll(self, task: BackgroundTask, on_success, on_error, on_poll):
+        """
+        Check whether a task has finished and run the matching callback, or check again after the poll interval.
+
+        Parameters:
+            task: The task to check
+            on_success: Called with the function's return value
+            on_error: Called with the exception if the function raised
+            on_poll: Called while the function is still running
+        """
+        if task.cancelled or task.future.cancelled():
+            return
+
+        if not task.future.done():
+            if on_poll:
+                on_poll()
+
+            self.widget.after(self.poll_interval, self.__poll, task, on_success, on_error, on_poll)
+            return
+
+        error = task.future.exception()
+
+        if error is None:
+            on_success(task.future.result())
+        elif on_error:
+            on_error(error)
@@ -0,0 +1,89 @@
+from itertools import islice
+
+from file_handler import QueryReader
+from format_handler import to_cents
+from instrumentation import timings
+
+class PayslipWriter:
+    def __init__(self, connection, file_name: str = 'save_payslip', batch_size: int = 1000):
+        """
+        Save calculated payslips to the pay results table in batches, committing one transaction per batch.
+
+        The save query is an idempotent upsert (e.g. a `MERGE` keyed on employee ID and date submitted) with six `?` parameter markers in the order employee ID, date submitted, gross cents, tax cents, super cents, net cents - so running the same pay run again updates the saved rows instead of adding new ones.
+
+        Batches are sent with `executemany`, using pyodbc's `fast_executemany` to send each batch as one parameter array when the driver supports it.
+
+        Parameters:
+            connection: An open DB-API connection, e.g. from `connect_sql_server` or `sqlite3.connect` for a local stand-in database
+            file_name: The name of the .sql file with the upsert query
+            batch_size: The number of payslips saved in each transaction
+        """
+        self.connection = connection
+        self.query = QueryReader(file_name).query
+        self.batch_size = batch_size
+        self.saved_count = 0
+
+    def save(self, payslips):
+        """
+        Save every payslip in batches.
+
+        Parameters:
+            payslips: An iterable of payslip data values in the same order as the CSV header
+
+        Returns:
+            saved_count(int): The number of payslips saved so far by this writer
+        """
+        for _ in self.save_while_passing(payslips):
+            pass
+
+        return self.saved_count
+
+    def save_while_passing(self, payslips):
+        """
+        Yield every payslip unchanged while saving them in batches, so a pay run can be exported and saved in the same pass.
+
+        Parameters:
+            payslips: An iterable of payslip data values in the same order as the CSV header
+
+        Returns:
+            A generator of the same payslip data values
+        """
+        payslips = iter(payslips)
+
+        while True:
+            batch = list(islice(payslips, self.batch_size))
+
+            if not batch:
+                return
+
+            self.__save_batch(batch)
+            yield from batch
+
+    def __save_batch(self, batch: list):
+        """
+        Upsert one batch of payslips in a single transaction, rolling the batch back if any row fails.
+
+        Parameters:
+            batch: The payslip data values to save
+        """
+        parameters = [[int(payslip_data[0]), payslip_data[3]] + [to_cents(float(amount)) for amount in payslip_data[4:8]] \
+                      for payslip_data in batch]
+
+        cursor = self.connection.cursor()
+
+        try:
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+
+            with timings.time('save_batch'):
+                cursor.executemany(self.query, parameters)
+                self.connection.commit()
+
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+        self.saved_count += len(batch)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import csv
+from datetime import date
+from typing import TYPE_CHECKING
+
+from query_database import PaySummaryStream
+from pay_run import calculate_batch
+from pay_results import PayRunResults
+from format_handler import to_cents, format_cents
+from file_handler import PAYSLIP_HEADER
+
+if TYPE_CHECKING:
+    from pyodbc import Cursor
+
+def financial_year_range(year: int):
+    """
+    Get the first and last day of an Australian financial year.
+
+    Parameters:
+        year: The calendar year the financial year ends in, e.g. `2024` for 1 July 2023 to 30 June 2024
+
+    Returns:
+        start_date(date), end_date(date): The first and last day of the financial year
+    """
+    return date(year - 1, 7, 1), date(year, 6, 30)
+
+def get_residence_threshold_group(row):
+    """
+    Get the reporting group of a timesheet row - its country of residence and whether the tax-free threshold is claimed.
+
+    Parameters:
+        row: A timesheet history row in the `employee_information` column order
+
+    Returns:
+        group(tuple): The `(country, threshold claimed)` group key
+    """
+    return row[4], row[6]
+
+class PayHistoryAggregator:
+    def __init__(self, group_key = get_residence_threshold_group):
+        """
+        Keep running week counts and whole-cent pay totals for every employee and every reporting group.
+
+        Only the totals are kept - each week of timesheets is calculated and added, then dropped - so memory depends on the number of employees and groups, not on the length of the history.
+
+        Parameters:
+            group_key: A function that gets the group key of a timesheet row (defaults to country and threshold claimed)
+        """
+        self.group_key = group_key
+        self.employee_totals = {}
+        self.group_totals = {}
+        self.row_count = 0
+
+    def add_rows(self, rows: list):
+        """
+        Calculate a batch of timesheet rows with the BatchPayCalculator class and add each week's rounded amounts to the running totals.
+
+        Parameters:
+            rows: Timesheet history rows in the `employee_information` column order
+        """
+        if not rows:
+            return
+
+        batch_calculator = calculate_batch(rows)
+        columns = (batch_calculator.gross_pay, batch_calculator.tax_amount, batch_calculator.super_amount, batch_calculator.net_pay)
+
+        for row, amounts in zip(rows, zip(*columns)):
+            cents = [to_cents(amount) for amount in amounts]
+
+            self.__add_to(self.employee_totals, row[0], cents)
+            self.__add_to(self.group_totals, self.group_key(row), cents)
+
+        self.row_count += len(rows)
+
+    def __add_to(self, totals: dict, key, cents: list):
+        """
+        Add one week's amounts to a running total, starting a new total the first time a key is seen.
+
+        Parameters:
+            totals: The running totals, keyed by employee ID or group
+            key: The employee ID or group key
+            cents: The gross pay, tax amount, superannuation and net pay in cents
+        """
+        running_total = totals.get(key)
+
+        if running_total is None:
+            totals[key] = [1] + cents
+            return
+
+        running_total[0] += 1
+        running_total[1] += cents[0]
+        running_total[2] += cents[1]
+        running_total[3] += cents[2]
+        running_total[4] += cents[3]
+
+    def employee_results(self):
+        """
+        Get the per-employee totals as a compact results store, ordered by employee ID.
+
+        Returns:
+            results(PayRunResults): The total gross pay, tax, superannuation and net pay of each employee in cents
+        """
+        employee_ids = sorted(self.employee_totals)
+        columns = [[self.employee_totals[employee_id][index] for employee_id in employee_ids] for index in range(1, 5)]
+
+        return PayRunResults(employee_ids, *columns)
+
+    def write_employee_report(self, file_path: str):
+        """
+        Write the week count and pay totals of every employee to a CSV file.
+
+        Parameters:
+            file_path: The report file to write
+        """
+        self.__write_report(file_path, 'Employee ID', self.employee_totals, sorted(self.employee_totals))
+
+    def write_group_report(self, file_path: str):
+        """
+        Write the week count and pay totals of every reporting group to a CSV file.
+
+        Parameters:
+            file_path: The report file to write
+        """
+        # Group keys can mix None with strings and bools, which only sort against each other as text
+        self.__write_report(file_path, 'Group', self.group_totals, sorted(self.group_totals, key=str))
+
+    def __write_report(self, file_path: str, key_name: str, totals: dict, keys: list):
+        """
+        Write running totals to a CSV file with one row per key.
+
+        Parameters:
+            file_path: The report file to write
+            key_name: The heading of the key column
+            totals: The running totals to write
+            keys: The keys of `totals` in the order to write them
+        """
+        header = [key_name, 'Weeks'] + PAYSLIP_HEADER[4:]
+
+        with open(file_path, mode='w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(header)
+
+            for key in keys:
+                week_count, *cents = totals[key]
+                key_value = ' / '.join(str(value) for value in key) if isinstance(key, tuple) else key
+
+                csv_writer.writerow([key_value, week_count] + [format_cents(amount) for amount in cents])
+
+def aggregate_pay_history(cursor: Cursor, start_date: date, end_date: date, file_name: str = 'timesheet_history', \
+                          page_size: int = 1000, aggregator: PayHistoryAggregator = None):
+    """
+    Calculate every timesheet submitted between two dates in one pass and total the pay per employee and per group.
+
+    The timesheet history query takes the start and end date as two `?` parameter markers and returns one row per timesheet in the `employee_information` column order. Rows are fetched with `fetchmany` and calculated a page at a time, so only one page is held in memory.
+
+    Parameters:
+        cursor: The database cursor returned from the pyodbc server connection
+        start_date: The first submission date to include
+        end_date: The last submission date to include
+        file_name: The name of the .sql file with the timesheet history query
+        page_size: The number of timesheet rows fetched and calculated at a time
+        aggregator: The PayHistoryAggregator to add to (defaults to a new one grouped by country and threshold claimed)
+
+    Returns:
+        aggregator(PayHistoryAggregator): The per-employee and per-group totals
+    """
+    if aggregator is None:
+        aggregator = PayHistoryAggregator()
+
+    pay_history = PaySummaryStream(cursor, file_name, page_size, [start_date.isoformat(), end_date.isoformat()])
+
+    for page in pay_history.pages:
+        aggregator.add_rows(page)
+
+    return aggregator